@@ -0,0 +1,138 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Raised inside a search to unwind it when its budget runs out
+class BudgetExpired(Exception):
+    pass
+
+
+# Time / iteration budget shared by the anytime solvers
+# Solvers call tick() in their main loop (cheap: the clock and the stop event are only read every
+# check_every ticks) and report() whenever they find a better tour. The best tour so far is kept on
+# the budget and passed to callback(route, cost) as 0-based indices, so a caller always has an answer
+# even if the solver is stopped early through time_limit, max_iterations, stop_event or cancel().
+class Budget:
+    def __init__(self, time_limit=None, max_iterations=None, callback=None, stop_event=None, deadline=None,
+                 check_every=256):
+        self.begin_time = time.time()
+        self.deadline = deadline
+        if time_limit is not None:
+            self.deadline = self.begin_time + time_limit if deadline is None else min(deadline, self.begin_time + time_limit)
+        self.max_iterations = max_iterations
+        self.callback = callback
+        self.stop_event = stop_event
+        self.check_every = check_every
+        self.next_check = check_every
+        self.iterations = 0
+        self.stopped = False
+        self.best_route = None
+        self.best_cost = None
+
+    # True when something can stop the solver (otherwise open-ended loops such as kicks never end)
+    @property
+    def limited(self):
+        return self.deadline is not None or self.max_iterations is not None or self.stop_event is not None
+
+    def expired(self):
+        if not self.stopped:
+            if self.max_iterations is not None and self.iterations >= self.max_iterations:
+                self.stopped = True
+            elif self.deadline is not None and time.time() >= self.deadline:
+                self.stopped = True
+            elif self.stop_event is not None and self.stop_event.is_set():
+                self.stopped = True
+        return self.stopped
+
+    # Count `count` units of work and return True once the budget has run out
+    def tick(self, count=1):
+        self.iterations += count
+        if self.stopped:
+            return True
+        if self.max_iterations is not None and self.iterations >= self.max_iterations:
+            self.stopped = True
+            return True
+        if self.iterations >= self.next_check:
+            self.next_check = self.iterations + self.check_every
+            return self.expired()
+        return False
+
+    def cancel(self):
+        self.stopped = True
+
+    def remaining(self):
+        return None if self.deadline is None else max(0.0, self.deadline - time.time())
+
+    # Limits for the Budget of each of `workers` processes sharing this budget's work:
+    # (deadline, its share of the iterations left)
+    def worker_limits(self, workers=1):
+        if self.max_iterations is None:
+            return self.deadline, None
+        return self.deadline, max(1, (self.max_iterations - self.iterations) // workers)
+
+    # Record a tour if it beats the best so far; returns True when it did
+    def report(self, route, cost):
+        if self.best_cost is not None and cost >= self.best_cost:
+            return False
+        self.best_route, self.best_cost = list(route), cost
+        if self.callback is not None:
+            self.callback(self.best_route, cost)
+        return True
+
+
+# Generator over the improving tours of a solver: run(budget) is started in a background thread and every
+# new best (route, cost) is yielded as soon as it is reported. Closing the generator (or leaving a for loop
+# early) cancels the solver; the solver's own return value is available as budget.result afterwards.
+def anytime(run, budget=None, **budget_options):
+    budget = budget or Budget(**budget_options)
+    improvements = queue.Queue()
+    callback = budget.callback
+
+    def forward(route, cost):
+        if callback is not None:
+            callback(route, cost)
+        improvements.put((route, cost))
+
+    def target():
+        try:
+            budget.result = run(budget)
+        finally:
+            improvements.put(None)
+
+    budget.callback = forward
+    budget.result = None
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = improvements.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        budget.cancel()
+        worker.join()
+
+
+# Context manager forwarding a budget to worker processes through a multiprocessing.Event
+# A daemon thread sets stop_event as soon as the budget runs out (deadline, max_iterations, its own
+# stop_event or cancel() from another thread), so workers polling the event stop even while the caller
+# is blocked waiting for their results
+@contextmanager
+def share_budget(budget, stop_event, interval=0.05):
+    done = threading.Event()
+
+    def watch():
+        while not done.wait(interval):
+            if budget.expired():
+                stop_event.set()
+                return
+
+    if budget is not None:
+        threading.Thread(target=watch, daemon=True).start()
+    try:
+        yield stop_event
+    finally:
+        done.set()
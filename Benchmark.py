@@ -0,0 +1,145 @@
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import argparse
+import csv
+import json
+import platform
+import statistics
+import time
+from Solvers import SOLVERS, load_instance, solve
+
+TSPLIB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tsplib-master")
+
+# Size tiers over the bundled corpus (file names without .tsp)
+TIERS = {
+    "tiny": ["att8", "burma10", "burma14", "ulysses16"],
+    "small": ["ulysses22", "bays29", "att48", "berlin52", "eil76"],
+    "medium": ["gr202", "a280", "ali535", "att532", "pr1002"],
+    "large": ["nrw1379", "u2152", "pcb3038", "rl5915"],
+    "huge": ["brd14051", "d18512", "pla33810", "pla85900"],
+}
+
+# Largest instance each solver is run on (exact solvers blow up quickly)
+SOLVER_LIMITS = {
+    "brute_force": 10,
+    "held_karp": 22,
+    "branch_bound": 52,
+    "christofides": 20000,
+    "simulated_annealing": 20000,
+    "hill_climbing": 100000,
+    "lin_kernighan": 20000,
+    "genetic_algorithm": 20000,
+    "nearest_neighbour": 100000,
+    "hilbert": 100000,
+    "greedy_edge": 100000,
+    "farthest_insertion": 100000,
+    "nearest_insertion": 100000,
+    "cheapest_insertion": 100000,
+    "decomposition": 100000,
+}
+
+# Solvers that need city coordinates (skipped on EXPLICIT instances)
+COORDINATE_SOLVERS = ("hilbert", "decomposition")
+
+RESULT_FIELDS = ["instance", "tier", "solver", "cities", "seed", "repeat", "cost", "optimum", "gap_percent",
+                 "load_time", "solve_time"]
+
+
+# Function to read the known optimal tour lengths from tsplib-master/solutions
+def load_optima(path=os.path.join(TSPLIB_DIR, "solutions")):
+    optima = {}
+    with open(path) as f:
+        for line in f:
+            name, _, value = line.partition(":")
+            value = value.split()
+            if value:
+                optima[name.strip()] = int(value[0])
+    return optima
+
+
+# Function to run every solver on every instance of the chosen tiers
+# Each (instance, solver) pair gets `warmup` untimed runs and then `repeats` timed runs, one seed per repeat
+def run_benchmark(tiers, solvers, repeats=3, warmup=1, seed=0, iterations=200000, directory=TSPLIB_DIR):
+    optima = load_optima()
+    results = []
+    for tier in tiers:
+        for name in TIERS[tier]:
+            filename = os.path.join(directory, name + ".tsp")
+            distances, cities, instance, load_time = load_instance(filename)
+            optimum = optima.get(name)
+            for solver in solvers:
+                if len(cities) > SOLVER_LIMITS.get(solver, float("inf")):
+                    continue
+                if solver in COORDINATE_SOLVERS and instance.coords is None:
+                    continue
+                for _ in range(warmup):
+                    solve(solver, cities, distances, instance, seed=seed, iterations=iterations)
+                for repeat in range(repeats):
+                    run_seed = seed + repeat
+                    result = solve(solver, cities, distances, instance, seed=run_seed, iterations=iterations)
+                    gap = None if optimum is None else 100.0 * (result["cost"] - optimum) / optimum
+                    results.append({
+                        "instance": name, "tier": tier, "solver": solver, "cities": len(cities), "seed": run_seed,
+                        "repeat": repeat, "cost": result["cost"], "optimum": optimum, "gap_percent": gap,
+                        "load_time": load_time, "solve_time": result["solve_time"],
+                    })
+                    print("%-10s %-20s cost=%-10d gap=%-8s time=%.4fs" % (
+                        name, solver, result["cost"], "-" if gap is None else "%.2f%%" % gap, result["solve_time"]), flush=True)
+    return results
+
+
+# Function to compare median solve times against an earlier results file
+# Returns (instance, solver, baseline seconds, current seconds) for every pair slower than `tolerance` times the baseline
+def find_regressions(results, baseline, tolerance=1.25):
+    def medians(rows):
+        groups = {}
+        for row in rows:
+            groups.setdefault((row["instance"], row["solver"]), []).append(row["solve_time"])
+        return {key: statistics.median(times) for key, times in groups.items()}
+
+    before, after = medians(baseline), medians(results)
+    return [(key[0], key[1], before[key], after[key]) for key in sorted(after)
+            if key in before and after[key] > tolerance * before[key]]
+
+
+def write_results(results, json_path=None, csv_path=None):
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=1)
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TSP solvers over the bundled TSPLIB instances")
+    parser.add_argument("--tiers", nargs="+", default=["tiny", "small"], choices=list(TIERS))
+    parser.add_argument("--solvers", nargs="+", default=sorted(SOLVERS), choices=sorted(SOLVERS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=200000, help="simulated annealing iterations")
+    parser.add_argument("--json", help="write results as JSON")
+    parser.add_argument("--csv", help="write results as CSV")
+    parser.add_argument("--baseline", help="earlier JSON results to check for slow-downs")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.tiers, args.solvers, args.repeats, args.warmup, args.seed, args.iterations)
+    write_results(results, args.json, args.csv)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for instance, solver, before, after in regressions:
+            print("REGRESSION %s %s: %.4fs -> %.4fs" % (instance, solver, before, after))
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
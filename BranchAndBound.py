@@ -1,14 +1,23 @@
+import heapq
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import tsplib95
-import matplotlib.pyplot as plt
 import time
+from DistanceMatrix import load_distance_matrix
+from CandidateNeighbours import matrix_neighbour_lists
+from LocalSearch import improve_tour, tour_cost
+from Tour import ArrayTour
+from Anytime import Budget, BudgetExpired, share_budget
+from Instrumentation import NULL_INSTRUMENTATION
+from LowerBound import held_karp_lower_bound, prim_mst
+from Plotting import finish_plot, pyplot
 
 
-# Load TSPLIB file using tsplib95
+# Load TSPLIB file into a NumPy adjacency matrix
 def load_tsp_file(filename):
-    problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    adj_matrix = np.array([[problem.get_weight(i, j) for j in cities] for i in cities]) # an adjacency matrix is a dis
+    adj_matrix, cities, problem = load_distance_matrix(filename) # an adjacency matrix is a dis
     return adj_matrix, cities, problem
 
 # Branch and Bound Functions
@@ -90,9 +99,283 @@ def solve_tsp_branch_bound(adj):
     end_time = time.time() #end the timer
     return final_res[0], final_path, begin_time, end_time
 
+# Branch and bound engine on an adjacency matrix
+# Per-city first/second minima are computed once, the visited set is an int bitmask,
+# the incumbent starts from a nearest neighbour + local search tour and the bound is either
+# the classic "two_min" bound or a "one_tree" bound (MST of the unvisited cities under
+# Held-Karp penalties computed at the root, plus the cheapest edges out of both path ends)
+# Asymmetric matrices always use "two_min" with minima of min(d[i][j], d[j][i]) (every tour edge costs at
+# least that in either direction) and the plain nearest neighbour warm start, as 2-opt assumes symmetry
+class BranchAndBoundSearch:
+    def __init__(self, adj, bound="one_tree", initial_tour=None, pi=None, budget=None):
+        self.adj = np.asarray(adj)
+        self.budget = budget
+        self.n = len(self.adj)
+        self.rows = self.adj.tolist()
+        self.symmetric = bool(np.array_equal(self.adj, self.adj.T))
+        self.bound = bound if self.symmetric else "two_min"
+        masked = self.adj.astype(np.float64)
+        np.fill_diagonal(masked, np.inf)
+        cheapest = masked if self.symmetric else np.minimum(masked, masked.T)
+        two = np.partition(cheapest, 1, axis=1)[:, :2] if self.n > 2 else np.zeros((self.n, 2))
+        self.first_mins = two[:, 0].tolist()
+        self.second_mins = two[:, 1].tolist()
+        self.child_order = [sorted(range(self.n), key=row.__getitem__) for row in self.rows]  # nearest first
+        self.nodes = 0
+        self.pruned = 0
+
+        if initial_tour is None:
+            initial_tour = self.heuristic_tour()
+        self.best_path = list(initial_tour) + [initial_tour[0]]
+        self.best_cost = tour_cost(initial_tour, self.distance)
+        if budget is not None:
+            budget.report(initial_tour, self.best_cost)
+
+        self.pi = np.zeros(self.n) if pi is None else np.asarray(pi, dtype=np.float64)
+        self.root_two_min = sum(f + s for f, s in zip(self.first_mins, self.second_mins)) / 2
+        self.root_bound = math.ceil(self.root_two_min - 1e-7)
+        if self.bound == "one_tree" and self.n > 3 and pi is None:
+            root, self.pi = held_karp_lower_bound(self.adj, self.best_cost)
+            self.root_bound = max(self.root_bound, math.ceil(root - 1e-7))
+        self.penalised = masked + self.pi[:, None] + self.pi[None, :]
+
+    def distance(self, i, j):
+        return self.rows[i][j]
+
+    # Warm start: nearest neighbour tour from city 0 improved by 2-opt / Or-opt (symmetric matrices only)
+    def heuristic_tour(self):
+        n = self.n
+        tour, visited = [0], [False] * n
+        visited[0] = True
+        for _ in range(n - 1):
+            tour.append(next(j for j in self.child_order[tour[-1]] if not visited[j]))
+            visited[tour[-1]] = True
+        if n >= 5 and self.symmetric:
+            array_tour = ArrayTour(tour)
+            improve_tour(array_tour, self.distance, matrix_neighbour_lists(self.adj, min(10, n - 1)).tolist())
+            tour = array_tour.route()
+            start = tour.index(0)
+            tour = tour[start:] + tour[:start]
+        return tour
+
+    # Lower bound on the cost of completing a path that ends at last with the cities in mask visited
+    def lower_bound(self, last, mask, cost, two_min):
+        if self.bound == "two_min":
+            return cost + two_min
+        remaining = [i for i in range(self.n) if not mask >> i & 1]
+        if not remaining:
+            return cost + self.rows[last][0]
+        # the rest of the tour is a path last -> remaining cities -> 0: one edge at each end
+        # plus a Hamiltonian path (so at least a spanning tree) through the remaining cities
+        nodes = np.array(remaining)
+        tree, _ = prim_mst(self.penalised[np.ix_(nodes, nodes)])
+        ends = self.penalised[last, nodes].min() + self.penalised[0, nodes].min()
+        return cost + tree + ends - 2.0 * self.pi[nodes].sum() - self.pi[last] - self.pi[0]
+
+    # Called at every node: picks up a better incumbent found elsewhere (parallel search)
+    # and unwinds the search with BudgetExpired once the budget runs out
+    # (nodes are expensive, so the clock is read at every node rather than every few hundred ticks)
+    def sync(self):
+        if self.budget is not None:
+            self.budget.tick()
+            if self.budget.expired():
+                raise BudgetExpired()
+
+    def offer(self, cost, path):
+        if cost < self.best_cost:
+            self.best_cost = cost
+            self.best_path = list(path) + [path[0]]
+            if self.budget is not None:
+                self.budget.report(path, cost)
+
+    # Children of a node as (bound, city, cost, two_min) sorted by bound
+    def children(self, path, mask, cost, two_min):
+        last, level = path[-1], len(path)
+        children = []
+        for i in self.child_order[last]:
+            if mask >> i & 1:
+                continue
+            child_cost = cost + self.rows[last][i]
+            # half of the cheapest edges still needed: one more at each path end, two at unvisited cities
+            if level == 1:
+                child_two_min = two_min - (self.second_mins[last] + self.second_mins[i]) / 2
+            else:
+                child_two_min = two_min - (self.first_mins[last] + self.second_mins[i]) / 2
+            bound = self.lower_bound(i, mask | 1 << i, child_cost, child_two_min)
+            if math.ceil(bound - 1e-7) >= self.best_cost:
+                self.pruned += 1
+                continue
+            children.append((bound, i, child_cost, child_two_min))
+        children.sort()
+        return children
+
+    # Depth-first search from a partial path
+    def depth_first(self, path, mask, cost, two_min):
+        self.nodes += 1
+        self.sync()
+        if len(path) == self.n:
+            self.offer(cost + self.rows[path[-1]][path[0]], path)
+            return
+        for bound, i, child_cost, child_two_min in self.children(path, mask, cost, two_min):
+            if math.ceil(bound - 1e-7) >= self.best_cost:  # incumbent may have improved meanwhile
+                self.pruned += 1
+                continue
+            path.append(i)
+            self.depth_first(path, mask | 1 << i, child_cost, child_two_min)
+            path.pop()
+
+    # Best-first search: always expand the open node with the smallest bound
+    def best_first(self, path, mask, cost, two_min):
+        heap = [(0.0, -len(path), 0, tuple(path), mask, cost, two_min)]
+        counter = 1
+        while heap:
+            bound, _, _, path, mask, cost, two_min = heapq.heappop(heap)
+            if math.ceil(bound - 1e-7) >= self.best_cost:
+                self.pruned += 1
+                continue
+            self.nodes += 1
+            self.sync()
+            if len(path) == self.n:
+                self.offer(cost + self.rows[path[-1]][path[0]], path)
+                continue
+            for child_bound, i, child_cost, child_two_min in self.children(list(path), mask, cost, two_min):
+                heapq.heappush(heap, (child_bound, -len(path) - 1, counter, path + (i,), mask | 1 << i, child_cost, child_two_min))
+                counter += 1
+
+    def solve(self, strategy="depth"):
+        if self.n > 3 and self.root_bound < self.best_cost:
+            search = self.best_first if strategy == "best" else self.depth_first
+            try:
+                search([0], 1, 0, self.root_two_min)
+            except BudgetExpired:
+                pass  # keep the best tour found so far
+        return self.best_cost, self.best_path
+
+
+# Rewritten branch and bound solver, same return shape as solve_tsp_branch_bound
+def branch_and_bound(adj, strategy="depth", bound="one_tree", initial_tour=None, budget=None,
+                     instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time() #start the timer
+    with instrumentation.phase("root_bound"):
+        search = BranchAndBoundSearch(adj, bound, initial_tour, budget=budget)
+    with instrumentation.phase("search"):
+        final_res, final_path = search.solve(strategy)
+    instrumentation.update({"nodes": search.nodes, "pruned": search.pruned})
+    end_time = time.time() #end the timer
+    return final_res, final_path, begin_time, end_time
+
+# Branch and bound worker that shares its incumbent cost with the other processes
+# through a multiprocessing.Value; the shared value is re-read every sync_interval nodes
+class SharedBranchAndBoundSearch(BranchAndBoundSearch):
+    def __init__(self, adj, bound, initial_tour, pi, shared_best, sync_interval=64, budget=None):
+        BranchAndBoundSearch.__init__(self, adj, bound, initial_tour, pi, budget)
+        self.shared_best = shared_best
+        self.sync_interval = sync_interval
+        self.improved = False
+
+    def sync(self):
+        BranchAndBoundSearch.sync(self)
+        if self.nodes % self.sync_interval == 0:
+            self.best_cost = min(self.best_cost, self.shared_best.value)
+
+    def offer(self, cost, path):
+        with self.shared_best.get_lock():
+            if cost < self.shared_best.value:
+                self.shared_best.value = cost
+        if cost < self.best_cost:
+            BranchAndBoundSearch.offer(self, cost, path)
+            self.improved = True
+
+
+WORKER_SEARCH = None
+
+
+# The worker budget stops at the caller's deadline, after the iterations it has left or once stop_event is set
+def init_branch_and_bound_worker(adj, bound, initial_tour, pi, shared_best, deadline=None, max_iterations=None,
+                                 stop_event=None):
+    global WORKER_SEARCH
+    budget = None
+    if deadline is not None or max_iterations is not None or stop_event is not None:
+        budget = Budget(deadline=deadline, max_iterations=max_iterations, stop_event=stop_event)
+    WORKER_SEARCH = SharedBranchAndBoundSearch(adj, bound, initial_tour, pi, shared_best, budget=budget)
+
+
+# Solve one subproblem (a fixed prefix of the tour) in a worker process
+def solve_subproblem(subproblem):
+    search = WORKER_SEARCH
+    path, mask, cost, two_min, strategy = subproblem
+    search.best_cost = min(search.best_cost, search.shared_best.value)
+    search.improved = False
+    nodes, pruned = search.nodes, search.pruned
+    try:
+        if strategy == "best":
+            search.best_first(path, mask, cost, two_min)
+        else:
+            search.depth_first(list(path), mask, cost, two_min)
+    except BudgetExpired:
+        pass
+    best_path = search.best_path if search.improved else None
+    return search.best_cost, best_path, search.nodes - nodes, search.pruned - pruned
+
+
+# Function to split the search tree into every surviving prefix of split_depth extra cities
+def split_subproblems(search, split_depth):
+    frontier = [((0,), 1, 0, search.root_two_min, search.root_bound)]
+    for _ in range(split_depth):
+        expanded = []
+        for path, mask, cost, two_min, _ in frontier:
+            if len(path) == search.n:
+                expanded.append((path, mask, cost, two_min, cost))
+                continue
+            for child_bound, i, child_cost, child_two_min in search.children(list(path), mask, cost, two_min):
+                expanded.append((path + (i,), mask | 1 << i, child_cost, child_two_min, child_bound))
+        frontier = expanded
+    frontier.sort(key=lambda item: item[4])  # most promising subproblems first
+    return frontier
+
+
+# Parallel branch and bound: the tree is split at split_depth and the subproblems are
+# distributed over a process pool; every worker prunes against the best cost found by any worker
+# With a budget, workers stop at its deadline, when the nodes searched reach its max_iterations or as soon as
+# it is cancelled (shared through a multiprocessing.Event), and queued subproblems are dropped
+def parallel_branch_and_bound(adj, split_depth=2, workers=None, strategy="depth", bound="one_tree", initial_tour=None,
+                              budget=None, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time() #start the timer
+    with instrumentation.phase("root_bound"):
+        search = BranchAndBoundSearch(adj, bound, initial_tour, budget=budget)
+    if search.n <= split_depth + 3 or search.root_bound >= search.best_cost:
+        with instrumentation.phase("search"):
+            final_res, final_path = search.solve(strategy)
+        instrumentation.update({"nodes": search.nodes, "pruned": search.pruned})
+        return final_res, final_path, begin_time, time.time()
+
+    subproblems = split_subproblems(search, split_depth)
+    shared_best = multiprocessing.Value("d", float(search.best_cost))
+    workers = workers or os.cpu_count() or 1
+    stop_event = multiprocessing.Event()
+    limits = budget.worker_limits(workers) if budget is not None else (None, None)
+    initargs = (search.adj, bound, search.best_path[:-1], search.pi, shared_best) + limits + (stop_event,)
+    instrumentation.count("subproblems", len(subproblems))
+    with instrumentation.phase("search"), share_budget(budget, stop_event):
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_branch_and_bound_worker, initargs=initargs) as pool:
+            tasks = [(path, mask, cost, two_min, strategy) for path, mask, cost, two_min, _ in subproblems]
+            for cost, path, nodes, pruned in pool.map(solve_subproblem, tasks):
+                search.nodes += nodes
+                search.pruned += pruned
+                if path is not None and cost < search.best_cost:
+                    search.offer(cost, path[:-1])
+                if budget is not None and (budget.tick(nodes) or budget.expired()):
+                    stop_event.set()  # workers still searching give up at their next node
+                    pool.shutdown(cancel_futures=True)
+                    break
+    instrumentation.update({"nodes": search.nodes, "pruned": search.pruned})
+    end_time = time.time() #end the timer
+    return search.best_cost, search.best_path, begin_time, end_time
+
 # Plotting the solution using matplotlib
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     # Get the coordinates of the cities from the problem
     city_coords = problem.node_coords
 
@@ -118,7 +401,7 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 # Example usage
 if __name__ == "__main__":
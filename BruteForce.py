@@ -1,16 +1,18 @@
-import tsplib95
 import numpy as np
-import random
 import itertools
-import matplotlib.pyplot as plt
+import multiprocessing
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from DistanceMatrix import load_distance_matrix, matrix_to_graph
+from Anytime import Budget, BudgetExpired, share_budget
+from Instrumentation import NULL_INSTRUMENTATION
+from Plotting import finish_plot, pyplot
 
 # Function to load a TSPLIB file and extract cities and distances
 def load_tsp_file(filename):
-    problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    graph = {i: {j: problem.get_weight(i, j) for j in cities} for i in cities}
-    G = problem.get_graph()
+    distances, cities, problem = load_distance_matrix(filename)
+    graph = matrix_to_graph(distances, cities)
     return cities, graph, problem
 
 # Function to calculate the cost of the route
@@ -41,8 +43,132 @@ def brute_force(cities, graph):
     return optimal_route, min_cost, begin_time, end_time
 
 
+# Exhaustive search state shared by every task a worker process runs
+BRUTE_FORCE_ROWS = None
+BRUTE_FORCE_BEST = None
+BRUTE_FORCE_BUDGET = None
+
+
+# The worker budget stops at the caller's deadline, after the iterations it has left or once stop_event is set
+def init_brute_force_worker(rows, shared_best, deadline=None, max_iterations=None, stop_event=None):
+    global BRUTE_FORCE_ROWS, BRUTE_FORCE_BEST, BRUTE_FORCE_BUDGET
+    BRUTE_FORCE_ROWS = rows
+    BRUTE_FORCE_BEST = shared_best
+    BRUTE_FORCE_BUDGET = Budget(deadline=deadline, max_iterations=max_iterations, stop_event=stop_event)
+
+
+# Depth-first enumeration of every tour 0, prefix..., ..., last_city (then back to 0) for one task
+# The closing city is fixed with the prefix, so branches are cut as soon as their cost plus the closing
+# edge last_city -> 0 reaches the best
+def search_prefix(task):
+    prefix, last_city = task
+    rows, shared_best, budget = BRUTE_FORCE_ROWS, BRUTE_FORCE_BEST, BRUTE_FORCE_BUDGET
+    n = len(rows)
+    path = list(prefix)
+    remaining = [city for city in range(n) if city not in prefix and city != last_city]
+    best = [shared_best.value, None]
+    checked = [0]
+
+    def extend(cost):
+        if checked[0] & 1023 == 0:
+            best[0] = min(best[0], shared_best.value)  # pick up improvements from other workers
+            if budget.tick(1024):
+                raise BudgetExpired()
+        checked[0] += 1
+        last = path[-1]
+        if not remaining:
+            total = cost + rows[last][last_city]
+            if total < best[0]:
+                best[0], best[1] = total, path + [last_city]
+                with shared_best.get_lock():
+                    if total < shared_best.value:
+                        shared_best.value = total
+            return
+        row = rows[last]
+        for k in range(len(remaining)):
+            city = remaining[k]
+            new_cost = cost + row[city]
+            if new_cost >= best[0]:
+                continue
+            remaining[k] = remaining[-1]
+            remaining.pop()
+            path.append(city)
+            extend(new_cost)
+            path.pop()
+            remaining.append(city)
+            remaining[-1], remaining[k] = remaining[k], city
+
+    cost = sum(rows[path[i]][path[i + 1]] for i in range(len(path) - 1)) + rows[last_city][0]
+    try:
+        extend(cost)
+    except BudgetExpired:
+        pass  # out of time: return the best tour of this task found so far
+    return best[0], best[1], checked[0]
+
+
+# Function to list every task (prefix 0, c1, ..., ck of the given length, closing city)
+# A tour and its mirror image are the same, so the closing city is always larger than c1:
+# every tour is searched in exactly one orientation ((N-1)!/2 tours)
+def brute_force_prefixes(n, prefix_length):
+    prefix_length = max(1, min(prefix_length, n - 2))
+    tasks = []
+    for p in itertools.permutations(range(1, n), prefix_length):
+        tasks.extend(((0,) + p, last) for last in range(p[0] + 1, n) if last not in p)
+    return tasks
+
+
+# Parallel exhaustive search on a distance matrix (0-based indices)
+# Fixes city 0 as the start, skips mirrored tours ((N-1)!/2 tours), splits the tours by prefix and
+# closing city over a process pool and shares the best cost between workers
+# With an Anytime.Budget the workers stop at its deadline, when the nodes searched reach its max_iterations
+# or as soon as it is cancelled (shared through a multiprocessing.Event); the best tour so far is returned
+def brute_force_parallel(cities, distances, workers=None, prefix_length=2, initial_cost=None, budget=None,
+                         instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time() #start the timer
+    n = len(cities)
+    rows = np.asarray(distances).tolist()
+    if n <= 3:
+        route = list(range(n))
+        cost = sum(rows[route[i - 1]][route[i]] for i in range(n))
+        return tuple(cities[i] for i in route), cost, begin_time, time.time()
+
+    # nearest neighbour tour: the first cut-off, and the answer if the budget runs out before anything better
+    tour, unvisited = [0], set(range(1, n))
+    while unvisited:
+        tour.append(min(unvisited, key=rows[tour[-1]].__getitem__))
+        unvisited.remove(tour[-1])
+    tour_cost = sum(rows[tour[i - 1]][tour[i]] for i in range(n))
+    if budget is not None:
+        budget.report(tour, tour_cost)
+    if initial_cost is None:
+        initial_cost = tour_cost
+    best_cost, best_route = initial_cost, None
+    shared_best = multiprocessing.Value("d", float(initial_cost) + 1)  # +1 so a tour equal to initial_cost is still found
+    workers = workers or os.cpu_count() or 1
+    stop_event = multiprocessing.Event()
+    limits = budget.worker_limits(workers) if budget is not None else (None, None)
+    initargs = (rows, shared_best) + limits + (stop_event,)
+    with share_budget(budget, stop_event), \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_brute_force_worker, initargs=initargs) as pool:
+        for cost, route, checked in pool.map(search_prefix, brute_force_prefixes(n, prefix_length), chunksize=4):
+            instrumentation.update({"prefixes": 1, "nodes": checked})
+            if route is not None and (best_route is None or cost < best_cost):
+                best_cost, best_route = cost, route
+                if budget is not None:
+                    budget.report(route, cost)
+            if budget is not None and (budget.tick(checked) or budget.expired()):
+                stop_event.set()  # workers still searching give up at their next check
+                pool.shutdown(cancel_futures=True)
+                break
+    if best_route is None or tour_cost < best_cost:
+        best_cost, best_route = tour_cost, tour
+    end_time = time.time() #end the timer
+    return tuple(cities[i] for i in best_route), int(best_cost), begin_time, end_time
+
+
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     # Get the coordinates of the cities from the problem
     city_coords = problem.node_coords
 
@@ -67,7 +193,7 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 # Main code
 if __name__ == "__main__":
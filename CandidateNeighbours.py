@@ -0,0 +1,180 @@
+import numpy as np
+from DistanceMatrix import BLOCK_ENTRIES, coord_distances, distance_coords
+from DistanceOracle import DistanceOracle, distance_block
+
+# Default number of candidate neighbours stored per city
+DEFAULT_K = 10
+
+# Edge weight types whose order matches plain Euclidean distance on the coordinates
+PLANAR_WEIGHT_TYPES = ("EUC_2D", "CEIL_2D", "ATT")
+
+# Rings searched around a cell before SpatialGrid.nearest falls back to a full scan
+MAX_RINGS = 6
+
+
+# Uniform grid over the city coordinates (about two cities per cell)
+# Cities are stored cell by cell (CSR layout) for the k-nearest build, and the grid
+# also supports removing cities so the nearest remaining city can be found quickly
+class SpatialGrid:
+    def __init__(self, coords, cities_per_cell=2.0):
+        self.points = np.asarray(coords, dtype=np.float64)
+        n = len(self.points)
+        self.low = self.points.min(axis=0)
+        span = np.maximum(self.points.max(axis=0) - self.low, 1e-9)
+        self.cell = max(float(np.sqrt(span[0] * span[1] * cities_per_cell / n)), float(span.max()) / max(n, 1), 1e-9)
+        self.shape = (np.floor(span / self.cell).astype(np.int64) + 1).tolist()
+
+        cell_xy = np.floor((self.points - self.low) / self.cell).astype(np.int64)
+        self.cell_x = np.minimum(cell_xy[:, 0], self.shape[0] - 1)
+        self.cell_y = np.minimum(cell_xy[:, 1], self.shape[1] - 1)
+        cell_ids = self.cell_x * self.shape[1] + self.cell_y
+        self.order = np.argsort(cell_ids, kind="stable").astype(np.int32)
+        self.starts = np.searchsorted(cell_ids[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+        self.alive = None
+
+    def __len__(self):
+        return len(self.points)
+
+    # Cities whose cell lies in the square of cells [x0, x1] x [y0, y1]
+    def cities_in_square(self, x0, x1, y0, y1):
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, self.shape[0] - 1), min(y1, self.shape[1] - 1)
+        pieces = []
+        for x in range(x0, x1 + 1):
+            first = x * self.shape[1]
+            start, stop = self.starts[first + y0], self.starts[first + y1 + 1]
+            if stop > start:
+                pieces.append(self.order[start:stop])
+        if not pieces:
+            return self.order[:0]
+        return np.concatenate(pieces)
+
+    # Exact Euclidean k-nearest neighbours of every city, grown ring by ring per cell
+    def k_nearest(self, k):
+        n = len(self.points)
+        k = min(k, n - 1)
+        result = np.empty((n, k), dtype=np.int32)
+        if k <= 0:
+            return result
+        cells = np.flatnonzero(np.diff(self.starts))
+        for cell in cells.tolist():
+            x, y = divmod(cell, self.shape[1])
+            members = self.order[self.starts[cell]:self.starts[cell + 1]]
+            ring = 1
+            while True:
+                candidates = self.cities_in_square(x - ring, x + ring, y - ring, y + ring)
+                covers_all = (x - ring <= 0 and y - ring <= 0 and
+                              x + ring >= self.shape[0] - 1 and y + ring >= self.shape[1] - 1)
+                if len(candidates) > k:
+                    diff = self.points[members][:, None, :] - self.points[candidates][None, :, :]
+                    squared = np.einsum("ijk,ijk->ij", diff, diff)
+                    squared[members[:, None] == candidates[None, :]] = np.inf
+                    nearest = np.argpartition(squared, k - 1, axis=1)[:, :k]
+                    radius = np.take_along_axis(squared, nearest, axis=1)
+                    # anything outside the searched square is at least ring cells away
+                    if covers_all or radius.max() <= (ring * self.cell) ** 2:
+                        order = np.argsort(radius, axis=1, kind="stable")
+                        result[members] = candidates[np.take_along_axis(nearest, order, axis=1)]
+                        break
+                elif covers_all:
+                    raise ValueError("not enough cities for k nearest neighbours")
+                ring += 1
+        return result
+
+    # Start tracking which cities are available for nearest() (all of them, or none with alive=False)
+    def reset(self, alive=True):
+        self.alive = np.full(len(self.points), alive, dtype=bool)
+        self.alive_count = len(self.points) if alive else 0
+        self.cell_counts = np.diff(self.starts).astype(np.int64) if alive else np.zeros(len(self.starts) - 1, dtype=np.int64)
+
+    def add(self, city):
+        if self.alive is None:
+            self.reset(False)
+        if not self.alive[city]:
+            self.alive[city] = True
+            self.alive_count += 1
+            self.cell_counts[self.cell_x[city] * self.shape[1] + self.cell_y[city]] += 1
+
+    def remove(self, city):
+        if self.alive is None:
+            self.reset()
+        if self.alive[city]:
+            self.alive[city] = False
+            self.alive_count -= 1
+            self.cell_counts[self.cell_x[city] * self.shape[1] + self.cell_y[city]] -= 1
+
+    # Nearest remaining city to a city (or to an arbitrary point), or -1 when none remain
+    def nearest(self, city=None, point=None):
+        if self.alive is None:
+            self.reset()
+        if self.alive_count == 0:
+            return -1
+        if point is None:
+            point = self.points[city]
+        point = np.asarray(point, dtype=np.float64)
+        cx = min(max(int((point[0] - self.low[0]) // self.cell), 0), self.shape[0] - 1)
+        cy = min(max(int((point[1] - self.low[1]) // self.cell), 0), self.shape[1] - 1)
+
+        best, best_squared = -1, np.inf
+        for ring in range(MAX_RINGS + 1):
+            pieces = []
+            for x in range(cx - ring, cx + ring + 1):
+                if x < 0 or x >= self.shape[0]:
+                    continue
+                step = 1 if abs(x - cx) == ring else 2 * ring
+                for y in range(cy - ring, cy + ring + 1, max(step, 1)):
+                    if 0 <= y < self.shape[1]:
+                        cell = x * self.shape[1] + y
+                        if self.cell_counts[cell]:
+                            pieces.append(self.order[self.starts[cell]:self.starts[cell + 1]])
+            if pieces:
+                members = np.concatenate(pieces)
+                members = members[self.alive[members]]
+                diff = self.points[members] - point
+                squared = np.einsum("ij,ij->i", diff, diff)
+                i = int(np.argmin(squared))
+                if squared[i] < best_squared:
+                    best, best_squared = int(members[i]), float(squared[i])
+            if best >= 0 and best_squared <= (ring * self.cell) ** 2:
+                return best
+
+        # Too many empty cells around the point: scan what is left in one vectorised pass
+        members = np.flatnonzero(self.alive)
+        diff = self.points[members] - point
+        return int(members[np.argmin(np.einsum("ij,ij->i", diff, diff))])
+
+
+# Function to build k nearest neighbour lists from planar coordinates using the spatial grid
+# The grid ranks by Euclidean distance; a stable re-rank by the rounded TSPLIB distance keeps ties in that order
+def coord_neighbour_lists(coords, edge_weight_type="EUC_2D", k=DEFAULT_K):
+    points = distance_coords(coords, edge_weight_type)
+    candidates = SpatialGrid(points).k_nearest(k)
+    lengths = coord_distances(points[:, None, :], points[candidates], edge_weight_type)
+    order = np.argsort(lengths, axis=1, kind="stable")
+    return np.ascontiguousarray(np.take_along_axis(candidates, order, axis=1), dtype=np.int32)
+
+
+# Function to build k nearest neighbour lists row block by row block from a matrix or an oracle
+def matrix_neighbour_lists(distances, k=DEFAULT_K):
+    n = len(distances)
+    k = min(k, n - 1)
+    block = max(1, BLOCK_ENTRIES // max(n, 1))
+    result = np.empty((n, k), dtype=np.int32)
+    everyone = np.arange(n)
+    for start in range(0, n, block):
+        rows = distance_block(distances, everyone[start:start + block], everyone).astype(np.float64)
+        rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        nearest = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1, kind="stable")
+        result[start:start + len(rows)] = np.take_along_axis(nearest, order, axis=1)
+    return result
+
+
+# Function to build candidate lists for a TSPInstance
+# Planar instances use the grid, GEO and EXPLICIT instances are ranked row by row
+def neighbour_lists(instance, distances=None, k=DEFAULT_K):
+    if instance.coords is not None and instance.edge_weight_type in PLANAR_WEIGHT_TYPES:
+        return coord_neighbour_lists(instance.coords, instance.edge_weight_type, k)
+    if distances is None:
+        distances = DistanceOracle(instance.coords, instance.edge_weight_type)
+    return matrix_neighbour_lists(distances, k)
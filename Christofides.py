@@ -1,13 +1,25 @@
-import tsplib95
-import networkx as nx
-import matplotlib.pyplot as plt
+import numpy as np
 import time
+from DistanceMatrix import BLOCK_ENTRIES, load_distance_matrix, matrix_to_graph, distance_coords
+from DistanceOracle import distance_block, distance_function, distance_row
+from CandidateNeighbours import PLANAR_WEIGHT_TYPES, SpatialGrid
+from Tour import route_cost
+from Instrumentation import NULL_INSTRUMENTATION
+from Plotting import finish_plot, pyplot
+
+# Largest number of odd-degree cities matched exactly with networkx in "auto" mode
+# (the blossom matching is pure Python and grows steeply, larger sets use the greedy matching)
+EXACT_MATCHING_LIMIT = 40
+
+# Candidate partners per odd city considered by the greedy matching
+MATCHING_NEIGHBOURS = 12
 
 # Load TSPLIB file
 def load_tsp_file(filename):
+    import tsplib95
+    distances, cities, instance = load_distance_matrix(filename)
+    graph = matrix_to_graph(distances, cities)
     problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    graph = {i: {j: problem.get_weight(i, j) for j in cities} for i in cities}
     G = problem.get_graph()
     return cities, graph, problem, G
 
@@ -22,6 +34,7 @@ def calculate_cost(route, graph):
 
 # Christofides Algorithm
 def christofides_tsp(G):
+    import networkx as nx
     begin_time = time.time()
     # Step 1: Minimum Spanning Tree
     mst = nx.minimum_spanning_tree(G)
@@ -51,8 +64,162 @@ def christofides_tsp(G):
     end_time = time.time()
     return tour, begin_time, end_time
 
+# Prim's MST on a dense matrix or a DistanceOracle, O(N^2) time but only O(N) extra memory
+# Returns the tree as two arrays of edge endpoints
+def prim_mst_edges(distances):
+    n = len(distances)
+    key = distance_row(distances, 0).astype(np.float64)
+    link = np.zeros(n, dtype=np.int64)
+    key[0] = np.inf
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    heads = np.empty(n - 1, dtype=np.int64)
+    tails = np.empty(n - 1, dtype=np.int64)
+    for k in range(n - 1):
+        j = int(np.argmin(key))
+        heads[k], tails[k] = link[j], j
+        in_tree[j] = True
+        key[j] = np.inf
+        row = distance_row(distances, j)
+        closer = (row < key) & ~in_tree
+        key[closer] = row[closer]
+        link[closer] = j
+    return heads, tails
+
+
+# Exact minimum weight perfect matching of the odd cities (networkx blossom on the compact odd-city graph)
+def exact_matching(distances, odd):
+    import networkx as nx
+    weights = distance_block(distances, odd, odd)
+    graph = nx.Graph()
+    rows, cols = np.triu_indices(len(odd), 1)
+    graph.add_weighted_edges_from(zip(odd[rows].tolist(), odd[cols].tolist(), weights[rows, cols].tolist()))
+    matching = nx.algorithms.matching.min_weight_matching(graph)
+    return [tuple(edge) for edge in matching]
+
+
+# Greedy matching: shortest candidate pairs first, then leftovers paired nearest-first,
+# then pairs (a, b), (c, d) are re-paired as (a, c), (b, d) while that is shorter and c is a candidate of a
+def greedy_matching(distances, odd, coords=None, edge_weight_type=None, k=MATCHING_NEIGHBOURS):
+    m = len(odd)
+    k = min(k, m - 1)
+    if coords is not None and edge_weight_type in PLANAR_WEIGHT_TYPES:
+        nearest = SpatialGrid(distance_coords(coords, edge_weight_type)[odd]).k_nearest(k)
+    else:
+        nearest = np.empty((m, k), dtype=np.int64)
+        block = max(1, BLOCK_ENTRIES // m)
+        for start in range(0, m, block):
+            rows = distance_block(distances, odd[start:start + block], odd).astype(np.float64)
+            rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+            nearest[start:start + len(rows)] = np.argpartition(rows, k - 1, axis=1)[:, :k]
+    first = np.repeat(np.arange(m), k)
+    second = nearest.reshape(-1)
+    lengths = distance_function(distances)
+    weights = np.array([lengths(a, b) for a, b in zip(odd[first].tolist(), odd[second].tolist())])
+
+    mate = [-1] * m
+    for e in np.argsort(weights, kind="stable").tolist():
+        a, b = int(first[e]), int(second[e])
+        if mate[a] < 0 and mate[b] < 0:
+            mate[a], mate[b] = b, a
+
+    left = np.array([a for a in range(m) if mate[a] < 0], dtype=np.int64)
+    while len(left):
+        row = distance_block(distances, odd[left[:1]], odd[left[1:]])[0]
+        j = int(np.argmin(row)) + 1
+        a, b = int(left[0]), int(left[j])
+        mate[a], mate[b] = b, a
+        left = np.delete(left, [0, j])
+
+    labels = odd.tolist()
+    w = lambda a, b: lengths(labels[a], labels[b])
+    nearest = nearest.tolist()
+    improved = True
+    while improved:
+        improved = False
+        for a in range(m):
+            for c in nearest[a]:
+                b, d = mate[a], mate[c]
+                if c == b:
+                    continue
+                if w(a, c) + w(b, d) < w(a, b) + w(c, d):
+                    mate[a], mate[c], mate[b], mate[d] = c, a, d, b
+                    improved = True
+                    break
+    return [(labels[a], labels[mate[a]]) for a in range(m) if a < mate[a]]
+
+
+# Hierholzer's algorithm on an edge list, returns the Euler circuit as a vertex sequence
+def euler_circuit(n, heads, tails):
+    adjacency = [[] for _ in range(n)]
+    for e, (a, b) in enumerate(zip(heads, tails)):
+        adjacency[a].append(e)
+        adjacency[b].append(e)
+    used = [False] * len(heads)
+    stack, circuit = [int(heads[0])], []
+    while stack:
+        v = stack[-1]
+        edges = adjacency[v]
+        while edges and used[edges[-1]]:
+            edges.pop()
+        if edges:
+            e = edges.pop()
+            used[e] = True
+            stack.append(tails[e] if heads[e] == v else heads[e])
+        else:
+            circuit.append(stack.pop())
+    return circuit
+
+
+# Christofides on array distances (matrix or DistanceOracle) without building a networkx complete graph
+# matching is "exact", "greedy" or "auto" (exact up to EXACT_MATCHING_LIMIT odd cities)
+def christofides_fast(cities, distances, matching="auto", coords=None, edge_weight_type=None,
+                      instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time()
+    n = len(cities)
+    if n <= 3:
+        route = list(range(n))
+        tour = [cities[i] for i in route] + [cities[0]]
+        return tour, sum(distance_function(distances)(route[i - 1], route[i]) for i in range(n)), begin_time, time.time()
+
+    # Step 1: Minimum Spanning Tree
+    with instrumentation.phase("mst"):
+        heads, tails = prim_mst_edges(distances)
+
+    # Step 2: Find odd degree nodes
+    degree = np.bincount(heads, minlength=n) + np.bincount(tails, minlength=n)
+    odd = np.flatnonzero(degree % 2 == 1)
+    instrumentation.count("odd_vertices", len(odd))
+
+    # Step 3: Minimum Weight Perfect Matching among odd degree nodes
+    with instrumentation.phase("matching"):
+        if matching == "exact" or (matching == "auto" and len(odd) <= EXACT_MATCHING_LIMIT):
+            pairs = exact_matching(distances, odd)
+        else:
+            pairs = greedy_matching(distances, odd, coords, edge_weight_type)
+
+    # Step 4 and 5: Combine MST and Matching, then find the Eulerian circuit
+    with instrumentation.phase("euler_tour"):
+        heads = heads.tolist() + [a for a, _ in pairs]
+        tails = tails.tolist() + [b for _, b in pairs]
+        circuit = euler_circuit(n, heads, tails)
+
+        # Step 6: Shortcutting to TSP Tour
+        seen = np.zeros(n, dtype=bool)
+        route = []
+        for v in circuit:
+            if not seen[v]:
+                seen[v] = True
+                route.append(v)
+    cost = route_cost(route, distances)
+    tour = [cities[i] for i in route] + [cities[route[0]]]
+    end_time = time.time()
+    return tour, cost, begin_time, end_time
+
+
 # Plotting function
-def plot_route(route, problem):
+def plot_route(route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     coords = problem.node_coords
     route_coords = [coords[city] for city in route]
     x_vals = [x for x, y in route_coords]
@@ -66,7 +233,7 @@ def plot_route(route, problem):
     plt.xlabel("X-coordinate")
     plt.ylabel("Y-coordinate")
     plt.grid(False)
-    plt.show()
+    finish_plot(plt, show, filename)
 
 # Main code
 if __name__ == "__main__":
@@ -0,0 +1,280 @@
+import heapq
+import time
+import numpy as np
+from CandidateNeighbours import DEFAULT_K, PLANAR_WEIGHT_TYPES, SpatialGrid, coord_neighbour_lists, matrix_neighbour_lists
+from DistanceMatrix import distance_coords
+from DistanceOracle import DistanceOracle, distance_block, distance_function, distance_row
+from Tour import route_cost
+
+# Bits per axis of the Hilbert curve grid (2^16 x 2^16 cells)
+HILBERT_ORDER = 16
+
+# Selection rules of insertion_tour
+INSERTION_SELECTIONS = ("farthest", "nearest", "cheapest")
+
+# Nearest tour cities (from the candidate list) whose two tour edges are tried when inserting a city
+INSERTION_CANDIDATES = 5
+
+
+# Function to get the position of every point along a Hilbert curve over their bounding box
+def hilbert_index(points, order=HILBERT_ORDER):
+    points = np.asarray(points, dtype=np.float64)
+    side = 1 << order
+    low = points.min(axis=0)
+    span = max(float((points.max(axis=0) - low).max()), 1e-9)
+    cells = np.minimum(((points - low) / span * side).astype(np.int64), side - 1)
+    x, y = cells[:, 0].copy(), cells[:, 1].copy()
+    index = np.zeros(len(points), dtype=np.int64)
+    s = side >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        index += s * s * ((3 * rx) ^ ry)
+        # rotate the quadrant so the curve inside it has the standard orientation
+        flip = ~ry & rx
+        x[flip] = side - 1 - x[flip]
+        y[flip] = side - 1 - y[flip]
+        swap = ~ry
+        x[swap], y[swap] = y[swap], x[swap]
+        s >>= 1
+    return index
+
+
+# Function to build a tour by visiting the cities in Hilbert curve order, O(N log N)
+def hilbert_tour(coords):
+    return np.argsort(hilbert_index(coords), kind="stable").tolist()
+
+
+# Distances of the edges (a[i], b[i]) for a dense matrix or an oracle
+def pair_distances(distances, a, b):
+    if isinstance(distances, DistanceOracle):
+        return distances.pairs(a, b)
+    return np.asarray(distances)[a, b]
+
+
+# Nearest city still marked in `alive` (a boolean array, or the spatial grid when there is one), -1 if none
+def nearest_alive(distances, grid, alive, city):
+    if grid is not None:
+        return grid.nearest(city)
+    members = np.flatnonzero(alive)
+    if len(members) == 0:
+        return -1
+    return int(members[np.argmin(distance_block(distances, [city], members)[0])])
+
+
+# Add the edges (heads[i], tails[i]) shortest first when both ends have degree < 2 and they join two fragments
+# links, degree and parent (union-find) are updated in place; returns the number of edges added
+def greedy_edges(distances, heads, tails, links, degree, parent):
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    order = np.argsort(pair_distances(distances, heads, tails), kind="stable")
+    added = 0
+    for a, b in zip(heads[order].tolist(), tails[order].tolist()):
+        if degree[a] == 2 or degree[b] == 2:
+            continue
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        parent[root_a] = root_b
+        links[a][degree[a]] = b
+        links[b][degree[b]] = a
+        degree[a] += 1
+        degree[b] += 1
+        added += 1
+    return added
+
+
+# Candidate edges (i < j, no duplicates) from k nearest neighbour lists over the cities `members`
+def candidate_edges(members, neighbours, n):
+    heads = np.repeat(members, neighbours.shape[1])
+    tails = members[neighbours.ravel()]
+    keys = np.unique(np.minimum(heads, tails) * n + np.maximum(heads, tails))
+    return keys // n, keys % n
+
+
+# Function to build a tour with the greedy edge heuristic over the candidate edges
+# Edges from the k nearest neighbour lists are taken shortest first whenever both ends still have degree < 2
+# and union-find says they join two different fragments. The free fragment ends are then matched the same
+# way over their own k nearest lists, and whatever is left is chained nearest end first
+def greedy_edge_tour(distances, neighbours, points=None):
+    n = len(neighbours)
+    if n < 3:
+        return list(range(n))
+    k = neighbours.shape[1]
+    parent = list(range(n))
+    links = [[-1, -1] for _ in range(n)]
+    degree = [0] * n
+    heads, tails = candidate_edges(np.arange(n, dtype=np.int64), neighbours, n)
+    added = greedy_edges(distances, heads, tails, links, degree, parent)
+
+    while added:
+        ends = np.flatnonzero(np.array(degree) < 2)
+        if len(ends) <= k + 1:
+            break
+        if points is not None:
+            end_neighbours = SpatialGrid(points[ends]).k_nearest(k)
+        else:
+            end_neighbours = matrix_neighbour_lists(distance_block(distances, ends, ends), k)
+        heads, tails = candidate_edges(ends, end_neighbours, n)
+        added = greedy_edges(distances, heads, tails, links, degree, parent)
+
+    # chain the fragments: walk each one to its far end, then jump to the nearest free end of another
+    alive = np.array(degree) < 2
+    grid = None
+    if points is not None:
+        grid = SpatialGrid(points)
+        grid.reset(False)
+        for city in np.flatnonzero(alive).tolist():
+            grid.add(city)
+    route = []
+    current = int(np.flatnonzero(alive)[0])
+    while current != -1:
+        previous, city = -1, current
+        while city != -1:
+            route.append(city)
+            following = [x for x in links[city] if x != -1 and x != previous]
+            previous, city = city, (following[0] if following else -1)
+        for end in (current, previous):
+            alive[end] = False
+            if grid is not None:
+                grid.remove(end)
+        current = nearest_alive(distances, grid, alive, previous)
+    return route
+
+
+# Function to build a tour by insertion, each city going in at the cheapest edge next to its nearest
+# tour city or one of its nearest candidate neighbours already in the tour
+# selection picks the next city: "farthest" from the tour, "nearest" to it or the "cheapest" to insert.
+# A lazy heap keeps the selection O(log N): a popped key is recomputed and the city is put back when it
+# has gone stale. Farthest insertion keeps every city's distance to the tour up to date, refreshing only
+# the cities within the current largest distance of each new tour city (found through the spatial grid);
+# the other rules find the nearest tour city through the candidate lists or the grid.
+def insertion_tour(distances, neighbours, points=None, selection="farthest"):
+    if selection not in INSERTION_SELECTIONS:
+        raise ValueError("Unknown insertion selection: " + selection + " (choose from " + ", ".join(INSERTION_SELECTIONS) + ")")
+    n = len(neighbours)
+    dist = distance_function(distances)
+    neighbour_rows = neighbours.tolist()
+    start = 0
+    succ, pred = [start] * n, [start] * n
+    succ_length = [0] * n  # dist(city, succ[city]) for the cities in the tour
+    in_tour = np.zeros(n, dtype=bool)
+    in_tour[start] = True
+    grid = None
+    if points is not None:
+        grid = SpatialGrid(points)
+        grid.reset(False)
+        grid.add(start)
+        gap = np.sqrt(np.einsum("ij,ij->i", points - points[start], points - points[start]))
+    else:
+        gap = distance_row(distances, start).astype(np.float64)
+    nearest_tour = np.full(n, start, dtype=np.int64)
+
+    def add(city, after):
+        before = succ[after]
+        succ[after], pred[city], succ[city], pred[before] = city, after, before, city
+        succ_length[after], succ_length[city] = dist(after, city), dist(city, before)
+        in_tour[city] = True
+        if grid is not None:
+            grid.add(city)
+        if selection == "farthest" and heap:
+            radius = -heap[0][0]  # no city outside the tour is farther from it than this
+            if grid is not None:
+                reach = int(radius // grid.cell) + 1
+                x, y = int(grid.cell_x[city]), int(grid.cell_y[city])
+                nearby = grid.cities_in_square(x - reach, x + reach, y - reach, y + reach)
+                diff = points[nearby] - points[city]
+                lengths = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+            else:
+                nearby = np.arange(n)
+                lengths = distance_row(distances, city)
+            closer = lengths < gap[nearby]
+            gap[nearby[closer]] = lengths[closer]
+            nearest_tour[nearby[closer]] = city
+
+    # (key, edge to insert after) for a city outside the tour, smaller keys go first
+    # The candidate lists are sorted, so the first one in the tour is the nearest tour city
+    def evaluate(city):
+        near = [x for x in neighbour_rows[city] if in_tour[x]][:INSERTION_CANDIDATES]
+        if selection == "farthest":
+            nearest = int(nearest_tour[city])
+        else:
+            nearest = near[0] if near else nearest_alive(distances, grid, in_tour, city)
+        best, after = None, nearest
+        for t in [nearest] + near:
+            for a in (pred[t], t):
+                delta = dist(a, city) + dist(city, succ[a]) - succ_length[a]
+                if best is None or delta < best:
+                    best, after = delta, a
+        if selection == "farthest":
+            return -float(gap[city]), after
+        if selection == "nearest":
+            return dist(city, nearest), after
+        return best, after
+
+    first = distance_row(distances, start).astype(np.float64)
+    keys = {"farthest": -gap, "nearest": first, "cheapest": 2 * first}[selection]
+    heap = [(float(keys[city]), city) for city in range(n) if city != start]
+    heapq.heapify(heap)
+
+    while heap:
+        _, city = heapq.heappop(heap)
+        if in_tour[city]:
+            continue
+        if selection == "farthest" and heap and -gap[city] > heap[0][0]:
+            heapq.heappush(heap, (-float(gap[city]), city))  # cheap staleness check before placing the city
+            continue
+        key, after = evaluate(city)
+        if heap and key > heap[0][0]:
+            heapq.heappush(heap, (key, city))  # stale key: try again once it is back at the top
+            continue
+        add(city, after)
+        if selection != "farthest":  # neighbours of the new city may now be nearer / cheaper
+            for x in neighbour_rows[city]:
+                if not in_tour[x]:
+                    heapq.heappush(heap, (evaluate(x)[0], x))
+
+    route = [start]
+    city = succ[start]
+    while city != start:
+        route.append(city)
+        city = succ[city]
+    return route
+
+
+CONSTRUCTIONS = ("hilbert", "greedy_edge") + tuple(selection + "_insertion" for selection in INSERTION_SELECTIONS)
+
+
+# Function to build a starting tour with one of the construction heuristics, same return shape as the other solvers
+# coords and edge_weight_type enable the space-filling curve and the spatial grid (planar instances);
+# without them greedy edge and insertion fall back to row scans of the distance matrix
+def construct_tour(cities, distances, method="greedy_edge", coords=None, edge_weight_type=None, neighbours=None, k=DEFAULT_K):
+    if method not in CONSTRUCTIONS:
+        raise ValueError("Unknown construction: " + method + " (choose from " + ", ".join(CONSTRUCTIONS) + ")")
+    begin_time = time.time()
+    n = len(cities)
+    planar = coords is not None and edge_weight_type in PLANAR_WEIGHT_TYPES
+    if n < 4:
+        route = list(range(n))
+    elif method == "hilbert":
+        if coords is None:
+            raise ValueError("the Hilbert curve tour needs city coordinates")
+        route = hilbert_tour(coords)
+    else:
+        if neighbours is None:
+            if planar:
+                neighbours = coord_neighbour_lists(coords, edge_weight_type, k)
+            else:
+                neighbours = matrix_neighbour_lists(distances, k)
+        points = distance_coords(coords, edge_weight_type) if planar else None
+        if method == "greedy_edge":
+            route = greedy_edge_tour(distances, neighbours, points)
+        else:
+            route = insertion_tour(distances, neighbours, points, method[:-len("_insertion")])
+    cost = route_cost(route, distances)
+    end_time = time.time()
+    return [cities[i] for i in route], cost, begin_time, end_time
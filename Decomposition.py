@@ -0,0 +1,228 @@
+import math
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from CandidateNeighbours import DEFAULT_K, PLANAR_WEIGHT_TYPES, coord_neighbour_lists, matrix_neighbour_lists
+from DistanceMatrix import BLOCK_ENTRIES, coord_matrix, distance_coords
+from DistanceOracle import DistanceOracle, distance_block, distance_function
+from Instrumentation import NULL_INSTRUMENTATION
+from LocalSearch import improve_tour
+from Tour import ArrayTour, route_cost
+
+# Most cities in one cluster (each cluster gets its own dense matrix in a worker)
+DEFAULT_CLUSTER_SIZE = 1000
+
+# Lloyd iterations of the k-means partition
+KMEANS_ITERATIONS = 10
+
+# Tour positions on each side of a junction between two clusters handed to the seam repair
+SEAM_WINDOW = 10
+
+
+# Function to split cities into strips by x and each strip into cells by y, none over cluster_size cities
+# Returns a list of index arrays
+def grid_partition(points, cluster_size=DEFAULT_CLUSTER_SIZE):
+    n = len(points)
+    strips = max(1, int(round(math.sqrt(math.ceil(n / cluster_size)))))
+    clusters = []
+    for strip in np.array_split(np.argsort(points[:, 0], kind="stable"), strips):
+        by_y = strip[np.argsort(points[strip, 1], kind="stable")]
+        clusters.extend(np.array_split(by_y, math.ceil(len(by_y) / cluster_size)))
+    return [cluster for cluster in clusters if len(cluster)]
+
+
+# Function to assign every point to its nearest centre, in row blocks so memory stays bounded
+def nearest_centres(points, centres):
+    labels = np.empty(len(points), dtype=np.int64)
+    block = max(1, BLOCK_ENTRIES // max(len(centres), 1))
+    centre_norms = np.einsum("ij,ij->i", centres, centres)
+    for start in range(0, len(points), block):
+        chunk = points[start:start + block]
+        labels[start:start + block] = np.argmin(centre_norms[None, :] - 2.0 * chunk @ centres.T, axis=1)
+    return labels
+
+
+# Function to split cities with k-means (k = n / cluster_size centres)
+# Clusters that end up larger than cluster_size are cut further with grid_partition
+def kmeans_partition(points, cluster_size=DEFAULT_CLUSTER_SIZE, seed=None, iterations=KMEANS_ITERATIONS):
+    n = len(points)
+    k = math.ceil(n / cluster_size)
+    rng = np.random.default_rng(seed)
+    centres = points[rng.choice(n, k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centres(points, centres)
+        counts = np.bincount(labels, minlength=k)
+        used = counts > 0
+        for axis in range(points.shape[1]):
+            sums = np.bincount(labels, weights=points[:, axis], minlength=k)
+            centres[used, axis] = sums[used] / counts[used]
+    labels = nearest_centres(points, centres)
+
+    clusters = []
+    order = np.argsort(labels, kind="stable")
+    for members in np.split(order, np.flatnonzero(np.diff(labels[order])) + 1):
+        if len(members) > cluster_size:
+            clusters.extend(members[part] for part in grid_partition(points[members], cluster_size))
+        elif len(members):
+            clusters.append(members)
+    return clusters
+
+
+PARTITIONS = {
+    "grid": lambda points, cluster_size, seed: grid_partition(points, cluster_size),
+    "kmeans": kmeans_partition,
+}
+
+
+# Function to order the clusters as a closed tour over their centroids
+def order_clusters(points, clusters, seed=None):
+    if len(clusters) < 4:
+        return list(range(len(clusters)))
+    from LocalSearch import local_search
+    centroids = np.array([points[cluster].mean(axis=0) for cluster in clusters])
+    diff = centroids[:, None, :] - centroids[None, :, :]
+    matrix = np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+    order, _, _, _ = local_search(list(range(len(clusters))), matrix, seed=seed)
+    return order
+
+
+# One cluster solve on a dense matrix of the cluster's own cities, returning a route of local indices
+def solve_cluster_nearest_neighbour(matrix, coords, edge_weight_type, seed):
+    from NearestNeighbour import tsp_nearest_neighbour_candidates
+    route, _, _, _ = tsp_nearest_neighbour_candidates(matrix, list(range(len(matrix))))
+    return route[:-1]
+
+
+def solve_cluster_hill_climbing(matrix, coords, edge_weight_type, seed):
+    from LocalSearch import local_search
+    route, _, _, _ = local_search(list(range(len(matrix))), matrix, seed=seed)
+    return route
+
+
+def solve_cluster_christofides(matrix, coords, edge_weight_type, seed):
+    from Christofides import christofides_fast
+    tour, _, _, _ = christofides_fast(list(range(len(matrix))), matrix, "auto", coords, edge_weight_type)
+    return tour[:-1]
+
+
+def solve_cluster_lin_kernighan(matrix, coords, edge_weight_type, seed):
+    from LinKernighan import lin_kernighan
+    route, _, _, _ = lin_kernighan(list(range(len(matrix))), matrix, seed=seed)
+    return route
+
+
+CLUSTER_SOLVERS = {
+    "nearest_neighbour": solve_cluster_nearest_neighbour,
+    "hill_climbing": solve_cluster_hill_climbing,
+    "christofides": solve_cluster_christofides,
+    "lin_kernighan": solve_cluster_lin_kernighan,
+}
+
+
+# Solve one cluster given its coordinates (runs in a worker process)
+def solve_cluster(task):
+    coords, edge_weight_type, solver, seed = task
+    if len(coords) < 4:
+        return list(range(len(coords)))
+    return CLUSTER_SOLVERS[solver](coord_matrix(coords, edge_weight_type), coords, edge_weight_type, seed)
+
+
+# Function to join the cluster tours (closed tours of global indices, in visiting order) into one route
+# Each tour is opened at the city nearest the previous exit and walked in the direction whose
+# last city is closer to the next cluster's centroid
+def stitch_tours(tours, points, distances):
+    centroids = [points[tour].mean(axis=0) for tour in tours]
+    route = []
+    junctions = []
+    for i, tour in enumerate(tours):
+        tour = np.asarray(tour)
+        if route:
+            entry = int(np.argmin(distance_block(distances, [route[-1]], tour)[0]))
+        else:
+            diff = points[tour] - centroids[-1]
+            entry = int(np.argmin(np.einsum("ij,ij->i", diff, diff)))
+        forward = np.roll(tour, -entry)
+        backward = np.concatenate((forward[:1], forward[:0:-1]))
+        target = centroids[(i + 1) % len(tours)]
+        ends = points[[forward[-1], backward[-1]]] - target
+        junctions.append(len(route))
+        route.extend((forward if ends[0] @ ends[0] <= ends[1] @ ends[1] else backward).tolist())
+    return route, junctions
+
+
+# Function to pick the cities around every junction for the seam repair
+def seam_cities(route, junctions, window=SEAM_WINDOW):
+    n = len(route)
+    seams = set()
+    for j in junctions:
+        for i in range(j - window, j + window):
+            seams.add(route[i % n])
+    return sorted(seams)
+
+
+# Decomposition solver for very large coordinate instances, same return shape as the other solvers
+# The cities are cut into clusters of at most cluster_size (partition "grid" or "kmeans"), every cluster is
+# solved with a registered solver over a process pool, the cluster tours are stitched in the order of a tour
+# over the cluster centroids and the seams are repaired with 2-opt / Or-opt ("local_search") or Lin-Kernighan
+def decomposition(cities, coords, edge_weight_type, distances=None, cluster_size=DEFAULT_CLUSTER_SIZE, partition="grid",
+                  solver="lin_kernighan", repair="local_search", workers=None, seed=None, k=DEFAULT_K, budget=None,
+                  instrumentation=NULL_INSTRUMENTATION):
+    if coords is None:
+        raise ValueError("decomposition needs city coordinates")
+    if partition not in PARTITIONS:
+        raise ValueError("Unknown partition: " + partition + " (choose from " + ", ".join(PARTITIONS) + ")")
+    if solver not in CLUSTER_SOLVERS:
+        raise ValueError("Unknown cluster solver: " + solver + " (choose from " + ", ".join(CLUSTER_SOLVERS) + ")")
+    if repair not in (None, "local_search", "lin_kernighan"):
+        raise ValueError("Unknown seam repair: " + str(repair))
+    begin_time = time.time()
+    coords = np.asarray(coords, dtype=np.float64)
+    points = distance_coords(coords, edge_weight_type)
+    if distances is None:
+        distances = DistanceOracle(coords, edge_weight_type)
+    seed = seed or 0
+
+    with instrumentation.phase("partition"):
+        clusters = PARTITIONS[partition](points, cluster_size, seed)
+        clusters = [clusters[i] for i in order_clusters(points, clusters, seed)]
+    instrumentation.count("clusters", len(clusters))
+
+    with instrumentation.phase("clusters"):
+        tasks = [(coords[cluster], edge_weight_type, solver, seed + i) for i, cluster in enumerate(clusters)]
+        workers = min(workers or os.cpu_count() or 1, len(tasks))
+        if workers == 1:
+            local_routes = [solve_cluster(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                local_routes = list(pool.map(solve_cluster, tasks))
+        tours = [cluster[list(local)] for cluster, local in zip(clusters, local_routes)]
+
+    with instrumentation.phase("stitch"):
+        route, junctions = stitch_tours(tours, points, distances)
+
+    if repair is not None and len(clusters) > 1 and len(route) >= 8:
+        with instrumentation.phase("candidates"):
+            if edge_weight_type in PLANAR_WEIGHT_TYPES:
+                neighbours = coord_neighbour_lists(coords, edge_weight_type, k)
+            else:
+                neighbours = matrix_neighbour_lists(distances, k)
+        neighbour_rows = neighbours.tolist()
+        seams = seam_cities(route, junctions)
+        instrumentation.count("seam_cities", len(seams))
+        tour = ArrayTour(route)
+        dist = distance_function(distances)
+        with instrumentation.phase("repair"):
+            if repair == "lin_kernighan":
+                from LinKernighan import lk_optimise
+                gain = lk_optimise(tour, dist, neighbour_rows, seams, budget=budget)
+            else:
+                gain, _ = improve_tour(tour, dist, neighbour_rows, active=seams, budget=budget)
+        instrumentation.count("repair_gain", gain)
+        route = tour.route()
+
+    cost = route_cost(route, distances)
+    if budget is not None:
+        budget.report(route, cost)
+    end_time = time.time()
+    return [cities[i] for i in route], cost, begin_time, end_time
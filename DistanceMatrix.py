@@ -0,0 +1,274 @@
+import re
+import numpy as np
+
+# TSPLIB constants used by the GEO distance function
+GEO_PI = 3.141592
+GEO_RADIUS = 6378.388
+
+# Edge weight types that are computed from NODE_COORD_SECTION
+COORD_WEIGHT_TYPES = ("EUC_2D", "CEIL_2D", "ATT", "GEO")
+
+# EDGE_WEIGHT_FORMATs understood by explicit_matrix
+EXPLICIT_FORMATS = ("FULL_MATRIX", "UPPER_ROW", "LOWER_ROW", "UPPER_DIAG_ROW", "LOWER_DIAG_ROW",
+                    "UPPER_COL", "LOWER_COL", "UPPER_DIAG_COL", "LOWER_DIAG_COL")
+
+# Maximum number of matrix entries computed in one NumPy block (keeps temporaries small)
+BLOCK_ENTRIES = 1 << 22
+
+
+# Lightweight replacement for the tsplib95 problem object
+# node_coords is kept so the plot_route functions in every script keep working
+class TSPInstance:
+    def __init__(self, name, edge_weight_type, edge_weight_format, dimension, cities, coords, weights, display_coords):
+        self.name = name
+        self.edge_weight_type = edge_weight_type
+        self.edge_weight_format = edge_weight_format
+        self.dimension = dimension
+        self.cities = cities  # TSPLIB node labels, position i is matrix index i
+        self.coords = coords  # (N, 2) float64 array or None for EXPLICIT instances
+        self.weights = weights  # flat EDGE_WEIGHT_SECTION values or None
+        self.display_coords = display_coords  # DISPLAY_DATA_SECTION coordinates or None
+
+    @property
+    def node_coords(self):
+        coords = self.coords if self.coords is not None else self.display_coords
+        if coords is None:
+            return {}
+        return dict(zip(self.cities, coords.tolist()))
+
+    def __len__(self):
+        return len(self.cities)
+
+
+# Bytes of section data parsed per chunk while streaming a file
+CHUNK_BYTES = 1 << 20
+
+# A line that starts with a letter ends a data section (next keyword or EOF)
+KEYWORD_LINE = re.compile(r"^[ \t]*[A-Za-z]", re.MULTILINE)
+
+
+# Function to work out how many numbers a data section holds, so its array can be allocated up front
+def expected_values(section, header):
+    if "DIMENSION" not in header:
+        return None
+    n = int(header["DIMENSION"])
+    if section in ("NODE_COORD_SECTION", "DISPLAY_DATA_SECTION"):
+        return n * coord_width(header)
+    if section == "EDGE_WEIGHT_SECTION":
+        edge_weight_format = header.get("EDGE_WEIGHT_FORMAT", "").upper()
+        if edge_weight_format == "FULL_MATRIX":
+            return n * n
+        if "DIAG" in edge_weight_format:
+            return n * (n + 1) // 2
+        return n * (n - 1) // 2
+    return None
+
+
+# Columns per coordinate row (label plus two or three coordinates)
+def coord_width(header):
+    three_d = header.get("NODE_COORD_TYPE", "").upper() == "THREED_COORDS" or \
+        header.get("EDGE_WEIGHT_TYPE", "").upper().endswith("_3D")
+    return 4 if three_d else 3
+
+
+# Function to read the numbers of one data section chunk by chunk into a preallocated float64 array
+# `pending` is text already read from the file; returns the values and the unread text after the section
+def read_section(f, pending, expected=None):
+    values = np.empty(expected if expected else 1024, dtype=np.float64)
+    filled = 0
+    while True:
+        text = pending or "".join(f.readlines(CHUNK_BYTES))
+        pending = ""
+        if not text:
+            break
+        match = KEYWORD_LINE.search(text)
+        numbers = np.fromstring(text if match is None else text[:match.start()], sep=" ")
+        if filled + len(numbers) > len(values):
+            values = np.resize(values, max(2 * len(values), filled + len(numbers)))
+        values[filled:filled + len(numbers)] = numbers
+        filled += len(numbers)
+        if match is not None:
+            pending = text[match.start():]
+            break
+    return values[:filled], pending
+
+
+# Function to stream a TSPLIB file into header keywords and numeric data sections
+def read_tsp_sections(f):
+    header = {}
+    sections = {}
+    pending = ""
+    while True:
+        if pending:
+            line, _, pending = pending.partition("\n")
+        else:
+            line = f.readline()
+            if not line:
+                break
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if stripped == "EOF":
+            break
+        key, _, value = stripped.partition(":")
+        key = key.strip().upper()
+        if key.endswith("_SECTION"):
+            sections[key], pending = read_section(f, pending, expected_values(key, header))
+        else:
+            header[key] = value.strip()
+    return header, sections
+
+
+# Function to turn the numbers of a coordinate section into labels and an (N, 2) array
+def parse_coord_section(values, width=3):
+    rows = values[:len(values) // width * width].reshape(-1, width)
+    order = np.argsort(rows[:, 0], kind="stable")  # tsplib95 sorts nodes by label
+    rows = rows[order]
+    labels = rows[:, 0].astype(np.int64).tolist()
+    return labels, np.ascontiguousarray(rows[:, 1:3])
+
+
+# Function to load formats this module cannot compute (e.g. MAN_2D, EUC_3D, XRAY) through tsplib95
+# The weights are expanded to a FULL_MATRIX so every solver can treat the result as an EXPLICIT instance
+def read_tsp_file_tsplib95(filename):
+    import tsplib95
+    problem = tsplib95.load(filename)
+    cities = list(problem.get_nodes())
+    n = len(cities)
+    weights = np.array([problem.get_weight(a, b) for a in cities for b in cities], dtype=np.float64)
+    display_coords = None
+    display = problem.display_data or problem.node_coords
+    if display:
+        display_coords = np.array([display[city][:2] for city in cities], dtype=np.float64)
+    return TSPInstance(problem.name, "EXPLICIT", "FULL_MATRIX", n, cities, None, weights, display_coords)
+
+
+# Function to load a TSPLIB file into a TSPInstance without building any distances
+# Sections are streamed in chunks straight into NumPy arrays; unsupported formats fall back to tsplib95
+def read_tsp_file(filename):
+    with open(filename) as f:
+        header, sections = read_tsp_sections(f)
+
+    name = header.get("NAME", "")
+    edge_weight_type = header.get("EDGE_WEIGHT_TYPE", "").upper()
+    edge_weight_format = header.get("EDGE_WEIGHT_FORMAT", "").upper() or None
+    dimension = int(header["DIMENSION"]) if "DIMENSION" in header else None
+    if edge_weight_type not in COORD_WEIGHT_TYPES + ("EXPLICIT",) or \
+            (edge_weight_type == "EXPLICIT" and edge_weight_format not in EXPLICIT_FORMATS):
+        return read_tsp_file_tsplib95(filename)
+
+    coords = None
+    display_coords = None
+    weights = None
+    cities = None
+    width = coord_width(header)
+
+    if len(sections.get("NODE_COORD_SECTION", ())):
+        cities, coords = parse_coord_section(sections["NODE_COORD_SECTION"], width)
+    if len(sections.get("DISPLAY_DATA_SECTION", ())):
+        display_cities, display_coords = parse_coord_section(sections["DISPLAY_DATA_SECTION"], width)
+        if cities is None:
+            cities = display_cities
+    if "EDGE_WEIGHT_SECTION" in sections:
+        weights = sections["EDGE_WEIGHT_SECTION"]
+    if cities is None:
+        cities = list(range(dimension))
+
+    return TSPInstance(name, edge_weight_type, edge_weight_format, dimension, cities, coords, weights, display_coords)
+
+
+# Function to convert GEO coordinates (DDD.MM) to latitude/longitude in radians
+def geo_radians(coords):
+    degrees = np.trunc(coords)
+    minutes = coords - degrees
+    return GEO_PI * (degrees + 5.0 * minutes / 3.0) / 180.0
+
+
+# Function to compute TSPLIB distances between two coordinate arrays that broadcast together
+# GEO coordinates must already be converted with geo_radians
+def coord_distances(a, b, edge_weight_type):
+    if edge_weight_type == "GEO":
+        q1 = np.cos(a[..., 1] - b[..., 1])
+        q2 = np.cos(a[..., 0] - b[..., 0])
+        q3 = np.cos(a[..., 0] + b[..., 0])
+        inner = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+        return np.floor(GEO_RADIUS * np.arccos(inner) + 1.0)
+
+    dx = a[..., 0] - b[..., 0]
+    dy = a[..., 1] - b[..., 1]
+    squared = dx * dx + dy * dy
+    if edge_weight_type == "EUC_2D":
+        return np.floor(np.sqrt(squared) + 0.5)
+    if edge_weight_type == "CEIL_2D":
+        return np.ceil(np.sqrt(squared))
+    if edge_weight_type == "ATT":
+        r = np.sqrt(squared / 10.0)
+        t = np.floor(r + 0.5)
+        return np.where(t < r, t + 1.0, t)
+    raise ValueError("Unsupported EDGE_WEIGHT_TYPE: " + str(edge_weight_type))
+
+
+# Function to prepare coordinates for coord_distances (only GEO needs converting)
+def distance_coords(coords, edge_weight_type):
+    coords = np.asarray(coords, dtype=np.float64)
+    if edge_weight_type == "GEO":
+        return geo_radians(coords)
+    return coords
+
+
+# Function to build a full N x N matrix from coordinates in row blocks
+def coord_matrix(coords, edge_weight_type, dtype=np.int32):
+    points = distance_coords(coords, edge_weight_type)
+    n = len(points)
+    matrix = np.empty((n, n), dtype=dtype)
+    block = max(1, BLOCK_ENTRIES // max(n, 1))
+    for start in range(0, n, block):
+        stop = min(n, start + block)
+        matrix[start:stop] = coord_distances(points[start:stop, None, :], points[None, :, :], edge_weight_type)
+    np.fill_diagonal(matrix, 0)
+    return matrix
+
+
+# Function to build a full N x N matrix from an EDGE_WEIGHT_SECTION
+def explicit_matrix(weights, n, edge_weight_format, dtype=np.int32):
+    weights = np.asarray(weights)
+    matrix = np.zeros((n, n), dtype=dtype)
+    if edge_weight_format == "FULL_MATRIX":
+        matrix[:] = weights[:n * n].reshape(n, n)
+        return matrix
+
+    # Column-wise formats of a symmetric matrix are the row-wise format of the other triangle
+    if edge_weight_format in ("UPPER_ROW", "LOWER_COL"):
+        rows, cols = np.triu_indices(n, 1)
+    elif edge_weight_format in ("LOWER_ROW", "UPPER_COL"):
+        rows, cols = np.tril_indices(n, -1)
+    elif edge_weight_format in ("UPPER_DIAG_ROW", "LOWER_DIAG_COL"):
+        rows, cols = np.triu_indices(n)
+    elif edge_weight_format in ("LOWER_DIAG_ROW", "UPPER_DIAG_COL"):
+        rows, cols = np.tril_indices(n)
+    else:
+        raise ValueError("Unsupported EDGE_WEIGHT_FORMAT: " + str(edge_weight_format))
+
+    values = weights[:len(rows)]
+    matrix[rows, cols] = values
+    matrix[cols, rows] = values
+    return matrix
+
+
+# Function to build the distance matrix for a loaded TSPInstance
+def distance_matrix(instance, dtype=np.int32):
+    if instance.edge_weight_type == "EXPLICIT":
+        n = instance.dimension if instance.dimension is not None else len(instance.cities)
+        return explicit_matrix(instance.weights, n, instance.edge_weight_format, dtype)
+    return coord_matrix(instance.coords, instance.edge_weight_type, dtype)
+
+
+# Function to load a TSPLIB file and build its distance matrix in one call
+def load_distance_matrix(filename, dtype=np.int32):
+    instance = read_tsp_file(filename)
+    return distance_matrix(instance, dtype), instance.cities, instance
+
+
+# Function to turn a distance matrix into the dict-of-dicts graph used by the older scripts
+def matrix_to_graph(matrix, cities):
+    return {i: dict(zip(cities, row)) for i, row in zip(cities, matrix.tolist())}
@@ -0,0 +1,138 @@
+import math
+from collections import OrderedDict
+import numpy as np
+from DistanceMatrix import (GEO_RADIUS, coord_distances, distance_coords, distance_matrix, read_tsp_file)
+
+
+# Scalar versions of the TSPLIB distance functions, used for single (i, j) lookups
+# where building NumPy temporaries would cost more than the arithmetic itself
+def euc_2d(a, b):
+    return int(math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) + 0.5)
+
+
+def ceil_2d(a, b):
+    return int(math.ceil(math.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)))
+
+
+def att(a, b):
+    r = math.sqrt(((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) / 10.0)
+    t = int(r + 0.5)
+    return t + 1 if t < r else t
+
+
+def geo(a, b):  # a and b are already (lat, lng) in radians
+    q1 = math.cos(a[1] - b[1])
+    q2 = math.cos(a[0] - b[0])
+    q3 = math.cos(a[0] + b[0])
+    inner = max(-1.0, min(1.0, 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)))
+    return int(GEO_RADIUS * math.acos(inner) + 1.0)
+
+
+SCALAR_DISTANCES = {"EUC_2D": euc_2d, "CEIL_2D": ceil_2d, "ATT": att, "GEO": geo}
+
+
+# Distance oracle computing coordinate-based distances on demand instead of storing an N x N matrix
+# Memory use is O(N) for the coordinates plus cache_rows rows of N int32 values
+class DistanceOracle:
+    def __init__(self, coords, edge_weight_type, cache_rows=0):
+        if edge_weight_type not in SCALAR_DISTANCES:
+            raise ValueError("Unsupported EDGE_WEIGHT_TYPE: " + str(edge_weight_type))
+        self.edge_weight_type = edge_weight_type
+        self.points = distance_coords(coords, edge_weight_type)
+        self.point_list = self.points.tolist()
+        self.scalar = SCALAR_DISTANCES[edge_weight_type]
+        self.cache_rows = cache_rows
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.points)
+
+    # Single distance between cities i and j (0-based indices)
+    def __call__(self, i, j):
+        if i == j:
+            return 0
+        return self.scalar(self.point_list[i], self.point_list[j])
+
+    # oracle[i][j] mirrors the graph[i][j] indexing used by the older scripts
+    def __getitem__(self, i):
+        return self.row(i)
+
+    # Distances from city i to every city, served from the LRU cache when possible
+    def row(self, i):
+        if self.cache_rows:
+            cached = self.cache.get(i)
+            if cached is not None:
+                self.cache.move_to_end(i)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        values = coord_distances(self.points[i], self.points, self.edge_weight_type).astype(np.int32)
+        values[i] = 0
+        if self.cache_rows:
+            values.flags.writeable = False
+            self.cache[i] = values
+            if len(self.cache) > self.cache_rows:
+                self.cache.popitem(last=False)
+        return values
+
+    # Distances from city i to each city in cities
+    def distances(self, i, cities):
+        cities = np.asarray(cities, dtype=np.intp)
+        values = coord_distances(self.points[i], self.points[cities], self.edge_weight_type).astype(np.int32)
+        values[cities == i] = 0
+        return values
+
+    # Element-wise distances between two equally sized index arrays
+    def pairs(self, a, b):
+        a = np.asarray(a, dtype=np.intp)
+        b = np.asarray(b, dtype=np.intp)
+        values = coord_distances(self.points[a], self.points[b], self.edge_weight_type).astype(np.int32)
+        values[a == b] = 0
+        return values
+
+    # Dense block of distances between rows and cols (used to build small sub-matrices)
+    def block(self, rows, cols):
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+        values = coord_distances(self.points[rows][:, None, :], self.points[cols][None, :, :], self.edge_weight_type)
+        values = values.astype(np.int32)
+        values[rows[:, None] == cols[None, :]] = 0
+        return values
+
+    # Total length of a closed tour given as 0-based indices
+    def tour_length(self, tour):
+        tour = np.asarray(tour, dtype=np.intp)
+        return int(self.pairs(tour, np.roll(tour, -1)).sum(dtype=np.int64))
+
+
+# Function to build a scalar dist(i, j) callable for either a dense matrix or an oracle
+def distance_function(distances):
+    if isinstance(distances, DistanceOracle):
+        return distances
+    if isinstance(distances, np.ndarray):
+        return distances.item
+    return lambda i, j: distances[i][j]
+
+
+# Function to get the distances from city i to every city for a matrix or an oracle
+def distance_row(distances, i):
+    if isinstance(distances, DistanceOracle):
+        return distances.row(i)
+    return np.asarray(distances[i])
+
+
+# Function to get a dense sub-matrix between rows and cols for a matrix or an oracle
+def distance_block(distances, rows, cols):
+    if isinstance(distances, DistanceOracle):
+        return distances.block(rows, cols)
+    return np.asarray(distances)[np.ix_(rows, cols)]
+
+
+# Function to load a TSPLIB file as an oracle (coordinate instances) or a dense matrix (EXPLICIT)
+def load_distance_oracle(filename, cache_rows=0):
+    instance = read_tsp_file(filename)
+    if instance.edge_weight_type == "EXPLICIT":
+        return distance_matrix(instance), instance.cities, instance
+    return DistanceOracle(instance.coords, instance.edge_weight_type, cache_rows), instance.cities, instance
@@ -0,0 +1,205 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from Anytime import share_budget
+from Construction import greedy_edge_tour, pair_distances
+from CandidateNeighbours import matrix_neighbour_lists
+from Instrumentation import NULL_INSTRUMENTATION
+from Tour import route_cost
+import MultiStart
+
+# Tours kept unchanged from one generation to the next
+ELITE = 2
+
+# Random 2-opt moves sampled per child in each improvement round (the best improving one is applied)
+TWO_OPT_SAMPLES = 32
+
+# Generations each island evolves on its own before the best tours migrate
+MIGRATION_INTERVAL = 25
+
+
+# Function to get the length of every tour in a population (one row per tour) in a single gather
+def population_costs(population, distances):
+    following = np.roll(population, -1, axis=1)
+    if isinstance(distances, np.ndarray):
+        return distances[population, following].sum(axis=1, dtype=np.int64)
+    lengths = pair_distances(distances, population.ravel(), following.ravel())
+    return lengths.reshape(population.shape).sum(axis=1, dtype=np.int64)
+
+
+# Function to draw `count` random tours of n cities as an int32 array
+def random_population(n, count, rng):
+    return np.argsort(rng.random((count, n)), axis=1).astype(np.int32)
+
+
+# Function to reverse positions i[r]..j[r] (inclusive) of every row r
+def reverse_segments(rows, i, j):
+    index = np.arange(rows.shape[1])[None, :]
+    inside = (index >= i[:, None]) & (index <= j[:, None])
+    source = np.where(inside, i[:, None] + j[:, None] - index, index)
+    return np.take_along_axis(rows, source, axis=1)
+
+
+# Function to pick `count` parents by binary tournament
+def tournament(costs, count, rng):
+    entrants = rng.integers(0, len(costs), size=(count, 2))
+    return np.where(costs[entrants[:, 0]] <= costs[entrants[:, 1]], entrants[:, 0], entrants[:, 1])
+
+
+# Order crossover (OX) for a batch of parent pairs
+# Each child copies a random slice of its first parent and takes the remaining cities in the order they
+# follow the slice in the second parent; the child is stored starting after the slice (same cycle)
+def order_crossover(first, second, rng):
+    count, n = first.shape
+    rows = np.arange(count)[:, None]
+    cuts = np.sort(rng.integers(0, n + 1, size=(count, 2)), axis=1)
+    i, j = cuts[:, 0], cuts[:, 1]
+    length = j - i
+    positions = np.arange(n)[None, :]
+    in_slice = np.zeros((count, n), dtype=bool)
+    in_slice[rows, first] = (positions >= i[:, None]) & (positions < j[:, None])
+    second_from_cut = np.take_along_axis(second, (j[:, None] + positions) % n, axis=1)
+    first_from_cut = np.take_along_axis(first, (i[:, None] + positions) % n, axis=1)
+    genes = np.concatenate((second_from_cut, first_from_cut), axis=1)
+    keep = np.concatenate((~in_slice[rows, second_from_cut], positions < length[:, None]), axis=1)
+    return genes[keep].reshape(count, n)
+
+
+# Random segment reversal on each row with probability `rate`
+def mutate(population, rate, rng):
+    count, n = population.shape
+    chosen = np.flatnonzero(rng.random(count) < rate)
+    if len(chosen) == 0:
+        return population
+    cuts = np.sort(rng.integers(0, n, size=(len(chosen), 2)), axis=1)
+    population[chosen] = reverse_segments(population[chosen], cuts[:, 0], cuts[:, 1])
+    return population
+
+
+# One batched 2-opt step: sample `samples` moves per row and apply each row's best move when it improves
+def two_opt_step(population, distances, rng, samples=TWO_OPT_SAMPLES):
+    count, n = population.shape
+    rows = np.arange(count)[:, None]
+    cuts = np.sort(rng.integers(1, n, size=(count, samples, 2)), axis=2)
+    i, j = cuts[:, :, 0], cuts[:, :, 1]
+    a, b = population[rows, i - 1], population[rows, i]
+    c, d = population[rows, j], population[rows, (j + 1) % n]
+    delta = (pair_distances(distances, a.ravel(), c.ravel()) + pair_distances(distances, b.ravel(), d.ravel())
+             - pair_distances(distances, a.ravel(), b.ravel()) - pair_distances(distances, c.ravel(), d.ravel()))
+    delta = delta.reshape(count, samples).astype(np.int64)
+    best = np.argmin(delta, axis=1)
+    improving = np.flatnonzero(delta[np.arange(count), best] < 0)
+    if len(improving):
+        population[improving] = reverse_segments(population[improving], i[improving, best[improving]],
+                                                 j[improving, best[improving]])
+    return population
+
+
+# Evolve one population for `generations` generations; returns (population, costs, evaluations)
+# Elitism keeps the best ELITE tours, the rest are OX children of tournament winners, mutated by a
+# random reversal and improved with batched 2-opt steps
+def evolve(population, costs, distances, generations, rng, elite=ELITE, mutation_rate=0.3, two_opt_rounds=4,
+           samples=TWO_OPT_SAMPLES, budget=None):
+    size = len(population)
+    evaluations = 0
+    for _ in range(generations):
+        if budget is not None and (budget.tick() or budget.expired()):  # generations are slow, read the clock every time
+            break
+        order = np.argsort(costs, kind="stable")
+        elites = population[order[:elite]]
+        parents = tournament(costs, 2 * (size - elite), rng)
+        children = order_crossover(population[parents[0::2]], population[parents[1::2]], rng)
+        children = mutate(children, mutation_rate, rng)
+        for _ in range(two_opt_rounds):
+            children = two_opt_step(children, distances, rng, samples)
+        population = np.concatenate((elites, children))
+        costs = np.concatenate((costs[order[:elite]], population_costs(children, distances)))
+        evaluations += len(children)
+        if budget is not None:
+            best = int(np.argmin(costs))
+            budget.report(population[best].tolist(), int(costs[best]))
+    return population, costs, evaluations
+
+
+# Evolve one island in a worker process (distances and budget limits come from MultiStart.init_multi_start_worker)
+def run_island(task):
+    population, costs, generations, seed, options = task
+    return evolve(population, costs, MultiStart.WORKER_DISTANCES, generations, np.random.default_rng(seed),
+                  budget=MultiStart.worker_budget(), **options)
+
+
+# Genetic algorithm on 0-based indices, same return shape as the other solvers
+# The population is one int32 array with a row per tour and all tour lengths come from one gather-and-sum.
+# With workers > 1 the population is split into islands evolved in a process pool (the distance matrix is
+# shared once through MultiStart.share_distances) and every MIGRATION_INTERVAL generations each island's
+# best tour replaces the worst tour of the next island.
+def genetic_algorithm(cities, distances, population_size=100, generations=500, elite=ELITE, mutation_rate=0.3,
+                      two_opt_rounds=4, samples=TWO_OPT_SAMPLES, workers=1, migration_interval=MIGRATION_INTERVAL,
+                      seed=None, seed_tour=True, budget=None, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time()
+    n = len(cities)
+    if n < 4:  # every tour of three or fewer cities is optimal
+        end_time = time.time()
+        return list(cities), route_cost(list(range(n)), distances), begin_time, end_time
+    rng = np.random.default_rng(seed)
+    options = {"elite": elite, "mutation_rate": mutation_rate, "two_opt_rounds": two_opt_rounds, "samples": samples}
+
+    with instrumentation.phase("initial_population"):
+        population = random_population(n, population_size, rng)
+        if seed_tour:  # one greedy edge tour gives the search a good starting point
+            population[0] = greedy_edge_tour(distances, matrix_neighbour_lists(distances))
+        costs = population_costs(population, distances)
+    evaluations = population_size
+
+    workers = max(1, min(workers or os.cpu_count() or 1, population_size // (elite + 2)))
+    with instrumentation.phase("evolution"):
+        if workers == 1:
+            population, costs, done = evolve(population, costs, distances, generations, rng, budget=budget, **options)
+            evaluations += done
+        else:
+            islands = np.array_split(np.arange(population_size), workers)
+            populations = [population[island] for island in islands]
+            island_costs = [costs[island] for island in islands]
+            initargs, memory = MultiStart.share_distances(distances)
+            limits, stop_event = MultiStart.budget_initargs(budget, workers)
+            try:
+                with share_budget(budget, stop_event), \
+                        ProcessPoolExecutor(max_workers=workers, initializer=MultiStart.init_multi_start_worker,
+                                            initargs=initargs + limits) as pool:
+                    remaining = generations
+                    while remaining > 0 and (budget is None or not budget.expired()):
+                        epoch = min(migration_interval, remaining)
+                        tasks = [(populations[w], island_costs[w], epoch, int(rng.integers(1 << 31)), options)
+                                 for w in range(workers)]
+                        results = list(pool.map(run_island, tasks))
+                        populations = [result[0] for result in results]
+                        island_costs = [result[1] for result in results]
+                        evaluations += sum(result[2] for result in results)
+                        remaining -= epoch
+                        if budget is not None:
+                            budget.tick(epoch)  # generations count against max_iterations as in the serial loop
+                        # ring migration: the best of island w replaces the worst of island w + 1
+                        best = [int(np.argmin(c)) for c in island_costs]
+                        migrants = [(populations[w][best[w]].copy(), island_costs[w][best[w]]) for w in range(workers)]
+                        for w in range(workers):
+                            tour, cost = migrants[w - 1]
+                            worst = int(np.argmax(island_costs[w]))
+                            populations[w][worst], island_costs[w][worst] = tour, cost
+                        if budget is not None:
+                            tour, cost = min(migrants, key=lambda migrant: migrant[1])
+                            budget.report(tour.tolist(), int(cost))
+            finally:
+                if memory is not None:
+                    memory.close()
+                    memory.unlink()
+            population, costs = np.concatenate(populations), np.concatenate(island_costs)
+    instrumentation.count("evaluations", evaluations)
+
+    best = int(np.argmin(costs))
+    best_route = population[best].tolist()
+    best_distance = int(costs[best])
+    if budget is not None:
+        budget.report(best_route, best_distance)
+    end_time = time.time()
+    return [cities[i] for i in best_route], best_distance, begin_time, end_time
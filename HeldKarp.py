@@ -1,14 +1,20 @@
-import tsplib95
 import math
 import time
-import matplotlib.pyplot as plt
+import numpy as np
+from DistanceMatrix import load_distance_matrix
+from Instrumentation import NULL_INSTRUMENTATION
+from Plotting import finish_plot, pyplot
+
+# Largest number of float entries evaluated in one vectorised block
+HK_BLOCK_ENTRIES = 1 << 22
+
+# Default cap on the memory held_karp may allocate; larger instances raise MemoryError before any table exists
+HK_MAX_MEMORY = 2 << 30
 
 # Function to load a TSPLIB file, extracting both distance matrix and problem data
 def load_tsp_file(filename):
-    problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    num_cities = len(cities)
-    distance_matrix = [[problem.get_weight(cities[i], cities[j]) for j in range(num_cities)] for i in range(num_cities)]
+    matrix, cities, problem = load_distance_matrix(filename)
+    distance_matrix = matrix.tolist()
     return problem, cities, distance_matrix
 
 # Function to solve TSP using dynamic programming
@@ -65,8 +71,115 @@ def tsp_dynamic_programming(filename):
     end_time = time.time() #end the timer
     return problem, cities, tour, min_cost, begin_time, end_time
 
+# Function to estimate the bytes held_karp needs for n cities
+def held_karp_memory(n, low_memory=False, itemsize=4):
+    m = n - 1
+    table_bytes = (m << (m - 1)) + (1 << m)  # compressed int8 parent table and the popcount of every mask
+    if not low_memory:
+        return table_bytes + (1 << m) * m * itemsize
+    widest = math.comb(m, m // 2)
+    return table_bytes + (1 << m) * 4 + 2 * widest * m * itemsize
+
+
+# Function to drop bit j from masks that contain it, the row index of those masks in parent[j]
+def without_bit(masks, j):
+    return ((masks >> (j + 1)) << j) | (masks & ((1 << j) - 1))
+
+
+# Held-Karp on NumPy arrays, filled layer by layer (subsets grouped by size)
+# City 0 is the fixed start; bit j of a mask stands for city j + 1.
+# dp is float32 when every tour length fits exactly. Parents are int8 and only stored for states whose
+# mask contains the last city: parent[j, without_bit(mask, j)], half the size of a full (2^m, m) table.
+# low_memory keeps only the previous and current layer of dp (indexed by rank within the layer).
+# max_memory (bytes, None for no cap) is checked against held_karp_memory before anything is allocated
+def held_karp(distances, low_memory=False, max_memory=HK_MAX_MEMORY, instrumentation=NULL_INSTRUMENTATION):
+    distances = np.asarray(distances)
+    n = len(distances)
+    if n <= 3:
+        tour = list(range(n)) + [0]
+        return tour, int(sum(distances[tour[i], tour[i + 1]] for i in range(n)))
+    if n - 1 > 127:
+        raise ValueError("Held-Karp is limited to 128 cities by the int8 parent table")
+    m = n - 1
+    dtype = np.float32 if float(distances.max()) * n < (1 << 24) else np.float64
+    needed = held_karp_memory(n, low_memory, np.dtype(dtype).itemsize)
+    if max_memory is not None and needed > max_memory:
+        raise MemoryError("Held-Karp needs about %d MB for %d cities" % (needed >> 20, n))
+
+    sub = distances[1:, 1:].astype(dtype)  # sub[k, j] = distance from city k + 1 to city j + 1
+    start = distances[0, 1:].astype(dtype)
+    bits = np.arange(m)
+    counts = np.zeros(1 << m, dtype=np.uint8)  # popcount of every mask
+    for j in range(m):
+        counts[1 << j:1 << (j + 1)] = counts[:1 << j] + 1
+    parent = np.full((m, 1 << (m - 1)), -1, dtype=np.int8)
+    block = max(1, HK_BLOCK_ENTRIES // m)
+
+    # first layer: paths 0 -> j
+    layer = (1 << bits).astype(np.int64)
+    if low_memory:
+        rank = np.zeros(1 << m, dtype=np.int32)
+        rank[layer] = np.arange(m)
+        previous = np.full((m, m), np.inf, dtype=dtype)
+        previous[bits, bits] = start
+    else:
+        dp = np.full((1 << m, m), np.inf, dtype=dtype)
+        dp[layer, bits] = start
+
+    for size in range(2, m + 1):
+        layer = np.flatnonzero(counts == size)
+        if low_memory:
+            rank[layer] = np.arange(len(layer))
+            current = np.full((len(layer), m), np.inf, dtype=dtype)
+        for j in range(m):
+            masks = layer[(layer >> j) & 1 == 1]
+            for lo in range(0, len(masks), block):
+                chunk = masks[lo:lo + block]
+                prev = chunk ^ (1 << j)
+                rows = previous[rank[prev]] if low_memory else dp[prev]
+                values = rows + sub[:, j]
+                best = np.argmin(values, axis=1)
+                cost = values[np.arange(len(chunk)), best]
+                if low_memory:
+                    current[rank[chunk], j] = cost
+                else:
+                    dp[chunk, j] = cost
+                parent[j, without_bit(chunk, j)] = best
+        if low_memory:
+            previous = current
+
+    full_mask = (1 << m) - 1
+    final = (previous[0] if low_memory else dp[full_mask]) + distances[1:, 0]
+    last = int(np.argmin(final))
+    min_cost = final[last]
+
+    # walk the parent table back from the full set
+    tour = []
+    mask = full_mask
+    while last >= 0:
+        tour.append(last + 1)
+        previous_city = int(parent[last, without_bit(mask, last)])
+        mask ^= 1 << last
+        last = previous_city
+    tour.append(0)
+    tour = tour[::-1]
+    tour.append(0)
+    instrumentation.update({"states": m << (m - 1), "transitions": m * m << (m - 1)})
+    return tour, int(round(float(min_cost)))
+
+
+# Function to solve a TSPLIB file with the NumPy Held-Karp engine (same return shape as tsp_dynamic_programming)
+def tsp_held_karp(filename, low_memory=False, max_memory=HK_MAX_MEMORY):
+    begin_time = time.time() #start the timer
+    distances, cities, problem = load_distance_matrix(filename)
+    tour, min_cost = held_karp(distances, low_memory, max_memory)
+    end_time = time.time() #end the timer
+    return problem, cities, [cities[i] for i in tour], min_cost, begin_time, end_time
+
+
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     city_coords = problem.node_coords
 
     route_coords = [city_coords[city] for city in route]
@@ -81,7 +194,7 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 # Main execution
 if __name__ == "__main__":
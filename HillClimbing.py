@@ -1,23 +1,14 @@
 import numpy as np
 import random
-import tsplib95
-import itertools
-import matplotlib.pyplot as plt
 import time
-
-
-
-# Set seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+from DistanceMatrix import load_distance_matrix, matrix_to_graph
+from Plotting import finish_plot, pyplot
 
 
 # Function to load a TSPLIB file and extract cities and distances
 def load_tsp_file(filename):
-    problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    graph = {i: {j: problem.get_weight(i, j) for j in cities} for i in cities}
-    G = problem.get_graph()
+    distances, cities, problem = load_distance_matrix(filename)
+    graph = matrix_to_graph(distances, cities)
     return cities, graph, problem
 
 def calculate_cost(route, graph): 
@@ -65,7 +56,8 @@ def hill_climbing(cities, graph):
 
 
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     # Get the coordinates of the cities from the problem
     city_coords = problem.node_coords
 
@@ -84,11 +76,14 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 
 # Main Code
 if __name__ == "__main__":
+    # Set seed for reproducibility (only for this script, importing the module leaves the global RNGs alone)
+    np.random.seed(42)
+    random.seed(42)
     filename = "./tsplib-master/gr202.tsp"  # Replace with your TSP file path
     cities, graph, problem = load_tsp_file(filename)
     best_route, best_distance, begin_time, end_time = hill_climbing(cities, graph)
@@ -0,0 +1,207 @@
+import bisect
+import time
+import numpy as np
+from DistanceMatrix import coord_distances, distance_coords, read_tsp_file
+from DistanceOracle import SCALAR_DISTANCES, DistanceOracle
+from CandidateNeighbours import DEFAULT_K, neighbour_lists
+from LocalSearch import improve_tour
+from Tour import ArrayTour
+from NearestNeighbour import tsp_nearest_neighbour_candidates
+
+
+# A tour that is kept up to date while cities are added, removed or moved
+# Cities are stored under dense 0-based indices; removing a city moves the last index into its slot,
+# so the tour, the coordinates and the candidate lists never need to be rebuilt from scratch.
+# After each change the tour is repaired by cheapest insertion and improved only around the touched cities.
+class IncrementalTour:
+    def __init__(self, instance, route=None, k=DEFAULT_K, moves=("2opt", "oropt")):
+        if instance.coords is None or instance.edge_weight_type not in SCALAR_DISTANCES:
+            raise ValueError("Incremental updates need a coordinate instance (EUC_2D, CEIL_2D, ATT or GEO)")
+        self.edge_weight_type = instance.edge_weight_type
+        self.scalar = SCALAR_DISTANCES[self.edge_weight_type]
+        self.k = k
+        self.moves = moves
+        self.labels = list(instance.cities)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.points = np.array(distance_coords(instance.coords, self.edge_weight_type))
+        self.point_list = self.points.tolist()
+        self.n = len(self.labels)
+
+        self.neighbours = neighbour_lists(instance, k=k).tolist()
+        self.radius = np.full(len(self.points), np.inf)
+        for i in range(self.n):
+            self.update_radius(i)
+
+        if route is None:
+            oracle = DistanceOracle(instance.coords, self.edge_weight_type)
+            route, _, _, _ = tsp_nearest_neighbour_candidates(oracle, list(range(self.n)), instance,
+                                                              np.array(self.neighbours))
+            route = route[:-1]
+        self.tour = ArrayTour(route)
+        if self.n >= 5:
+            improve_tour(self.tour, self, self.neighbours, self.moves)
+        self.cost = self.tour_length()
+
+    def __len__(self):
+        return self.n
+
+    # dist(i, j) for improve_tour and the nearest neighbour start
+    def __call__(self, i, j):
+        if i == j:
+            return 0
+        return self.scalar(self.point_list[i], self.point_list[j])
+
+    # Distances from city i to every current city
+    def row(self, i):
+        return self.distances_from(self.points[i])
+
+    def distances_from(self, point):
+        return coord_distances(point, self.points[:self.n], self.edge_weight_type).astype(np.int64)
+
+    def tour_length(self):
+        order = self.tour.order
+        return sum(self(order[i - 1], order[i]) for i in range(len(order)))
+
+    def update_radius(self, i):
+        candidates = self.neighbours[i]
+        self.radius[i] = self(i, candidates[-1]) if len(candidates) >= min(self.k, self.n - 1) > 0 else np.inf
+
+    # Rebuild the candidate list of city i from one vectorised distance row
+    def rebuild_neighbours(self, i):
+        row = self.row(i).astype(np.float64)
+        row[i] = np.inf
+        k = min(self.k, self.n - 1)
+        if k <= 0:
+            self.neighbours[i] = []
+        else:
+            nearest = np.argpartition(row, k - 1)[:k]
+            self.neighbours[i] = nearest[np.argsort(row[nearest], kind="stable")].tolist()
+        self.update_radius(i)
+
+    # Cheapest place to put city x: next to one of its candidates, or anywhere when the tour is tiny
+    def cheapest_insertion(self, x):
+        order = self.tour.order
+        if len(order) < 2:
+            return (order[0] if order else None), 0
+        places = self.neighbours[x] if len(order) > self.k else order
+        best, best_delta = None, None
+        for c in places:
+            for left in (c, self.tour.pred(c)):
+                right = self.tour.succ(left)
+                delta = self(left, x) + self(x, right) - self(left, right)
+                if best_delta is None or delta < best_delta:
+                    best, best_delta = left, delta
+        return best, best_delta
+
+    # Add a city with the given coordinates, returns its index
+    def add_city(self, label, coord):
+        if label in self.index:
+            raise ValueError("City already in the tour: " + str(label))
+        if self.n == len(self.points):  # grow the coordinate store by doubling
+            grown = np.empty((max(2 * self.n, 16), 2))
+            grown[:self.n] = self.points[:self.n]
+            self.points = grown
+            self.radius = np.concatenate([self.radius, np.full(len(grown) - len(self.radius), np.inf)])
+        x = self.n
+        self.points[x] = distance_coords(np.array([coord]), self.edge_weight_type)[0]
+        self.point_list.append(self.points[x].tolist())
+        self.labels.append(label)
+        self.index[label] = x
+        self.n += 1
+
+        # x joins the candidate list of every city it is closer to than that city's current k-th neighbour
+        row = self.row(x)
+        for c in np.flatnonzero(row[:x] < self.radius[:x]).tolist():
+            candidates = self.neighbours[c]
+            distances = [self(c, other) for other in candidates]
+            candidates.insert(bisect.bisect_right(distances, row[c]), x)
+            del candidates[self.k:]
+            self.update_radius(c)
+        self.neighbours.append([])
+        self.rebuild_neighbours(x)
+        if self.n - 1 <= self.k:  # small instance: every other list can still grow
+            for c in range(x):
+                self.rebuild_neighbours(c)
+
+        after, delta = self.cheapest_insertion(x)
+        if after is None:  # first city of an empty tour
+            self.tour = ArrayTour([x])
+        else:
+            self.tour.insert(x, after)
+        self.cost += delta
+        return x
+
+    # Remove a city, returns the cities next to the gap it leaves
+    def remove_city(self, label):
+        x = self.index.pop(label)
+        p, s = self.tour.pred(x), self.tour.succ(x)
+        self.cost -= self(p, x) + self(x, s) - self(p, s)
+        self.tour.remove(x)
+        last = self.n - 1
+
+        # move the last city into slot x so indices stay dense
+        affected = [c for c in range(self.n) if x in self.neighbours[c]]
+        if last != x:
+            self.points[x] = self.points[last]
+            self.point_list[x] = self.point_list[last]
+            self.labels[x] = self.labels[last]
+            self.index[self.labels[x]] = x
+            self.neighbours[x] = self.neighbours[last]
+            self.radius[x] = self.radius[last]
+            self.tour.rename(last, x)
+            for c in range(self.n):
+                candidates = self.neighbours[c]
+                if last in candidates:
+                    candidates[candidates.index(last)] = x
+            p, s = (x if p == last else p), (x if s == last else s)
+            affected = [x if c == last else c for c in affected if c != x]
+        self.points[last] = 0
+        self.point_list.pop()
+        self.labels.pop()
+        self.neighbours.pop()
+        self.radius[last] = np.inf
+        self.tour.pos.pop()
+        self.n -= 1
+        for c in affected:
+            self.rebuild_neighbours(c)
+        return [c for c in (p, s) if c < self.n]
+
+    # Apply a batch of changes and re-optimise around them
+    # inserts: {label: (x, y)}, deletes: [label, ...], moves: {label: (x, y)}
+    # Returns (cost after the update, seconds taken)
+    def update(self, inserts=None, deletes=(), moves=None):
+        begin_time = time.time()
+        touched = set()
+        for label in deletes:
+            touched.update(self.remove_city(label))
+        for label, coord in (moves or {}).items():
+            touched.update(self.remove_city(label))
+            touched.add(self.add_city(label, coord))
+        for label, coord in (inserts or {}).items():
+            touched.add(self.add_city(label, coord))
+        touched = [c for c in touched if c < self.n]
+        if self.n >= 5 and touched:
+            active = set(touched)
+            for c in touched:
+                active.update((self.tour.pred(c), self.tour.succ(c)))
+            gain, _ = improve_tour(self.tour, self, self.neighbours, self.moves, active=sorted(active))
+            self.cost -= gain
+        return self.cost, time.time() - begin_time
+
+    def insert(self, label, coord):
+        return self.update(inserts={label: coord})
+
+    def delete(self, label):
+        return self.update(deletes=[label])
+
+    def relocate(self, label, coord):
+        return self.update(moves={label: coord})
+
+    # Current tour as city labels
+    def route(self):
+        return [self.labels[i] for i in self.tour.order]
+
+
+# Function to build an incremental tour for a TSPLIB file
+def load_incremental_tour(filename, route=None, k=DEFAULT_K):
+    return IncrementalTour(read_tsp_file(filename), route, k)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from DistanceMatrix import TSPInstance, distance_matrix, read_tsp_file
+
+# Name of the cache folder created next to the instance files
+CACHE_DIR_NAME = ".tsp_cache"
+
+# Distance matrices larger than this are not cached (the instance itself still is)
+MAX_MATRIX_BYTES = 1 << 30
+
+# Total cache size kept before the least recently used entries are evicted
+MAX_CACHE_BYTES = 4 << 30
+
+CACHE_VERSION = 1
+
+
+# Function to hash the file contents so edited instances never reuse a stale entry
+def file_key(filename):
+    digest = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_dir(filename):
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+
+def entry_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+# Function to write a new cache entry (written to a temporary folder first, then renamed into place)
+def write_entry(path, instance, matrix):
+    parent = os.path.dirname(path)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".tmp-")
+    try:
+        meta = {
+            "version": CACHE_VERSION,
+            "name": instance.name,
+            "edge_weight_type": instance.edge_weight_type,
+            "edge_weight_format": instance.edge_weight_format,
+            "dimension": instance.dimension,
+        }
+        np.save(os.path.join(staging, "cities.npy"), np.asarray(instance.cities, dtype=np.int64))
+        for field in ("coords", "display_coords", "weights"):
+            value = getattr(instance, field)
+            if value is not None:
+                np.save(os.path.join(staging, field + ".npy"), value)
+        if matrix is not None:
+            np.save(os.path.join(staging, "matrix.npy"), matrix)
+        with open(os.path.join(staging, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, path)
+        except OSError:  # another process cached the same file first
+            shutil.rmtree(staging, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+# Function to open a cache entry; arrays are memory-mapped so every process shares the same pages
+def read_entry(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("version") != CACHE_VERSION:
+        return None, None
+
+    def optional(field):
+        file = os.path.join(path, field + ".npy")
+        return np.load(file, mmap_mode="r") if os.path.exists(file) else None
+
+    cities = np.load(os.path.join(path, "cities.npy")).tolist()
+    instance = TSPInstance(meta["name"], meta["edge_weight_type"], meta["edge_weight_format"], meta["dimension"],
+                           cities, optional("coords"), optional("weights"), optional("display_coords"))
+    os.utime(os.path.join(path, "meta.json"))  # mark as recently used for eviction
+    return instance, optional("matrix")
+
+
+# Function to delete least recently used entries until the cache fits in max_bytes
+def evict(cache_dir, max_bytes=MAX_CACHE_BYTES, keep=None):
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        meta = os.path.join(path, "meta.json")
+        if os.path.isdir(path) and os.path.exists(meta):
+            entries.append((os.path.getmtime(meta), entry_size(path), path))
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        removed.append(path)
+    return removed
+
+
+# Function to load an instance (and its distance matrix when it fits in max_matrix_bytes) through the cache
+# Returns (matrix or None, cities, instance) - the matrix is a read-only memory map
+def load_cached_instance(filename, cache_dir=None, build_matrix=True, max_matrix_bytes=MAX_MATRIX_BYTES,
+                         max_cache_bytes=MAX_CACHE_BYTES):
+    cache_dir = cache_dir or default_cache_dir(filename)
+    path = os.path.join(cache_dir, file_key(filename))
+    if os.path.exists(os.path.join(path, "meta.json")):
+        instance, matrix = read_entry(path)
+        if instance is not None and (matrix is not None or not build_matrix or
+                                     len(instance.cities) ** 2 * 4 > max_matrix_bytes):
+            return matrix, instance.cities, instance
+        shutil.rmtree(path, ignore_errors=True)  # old version or built without a matrix: rebuild
+
+    instance = read_tsp_file(filename)
+    n = instance.dimension if instance.edge_weight_type == "EXPLICIT" else len(instance.cities)
+    matrix = None
+    if build_matrix and n * n * 4 <= max_matrix_bytes:
+        matrix = distance_matrix(instance)
+    write_entry(path, instance, matrix)
+    evict(cache_dir, max_cache_bytes, keep=path)
+    instance, matrix = read_entry(path)
+    return matrix, instance.cities, instance
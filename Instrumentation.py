@@ -0,0 +1,89 @@
+import cProfile
+import io
+import pstats
+import time
+from contextlib import contextmanager, nullcontext
+
+# Rows of the cProfile table kept in the report
+PROFILE_ROWS = 25
+
+
+# Opt-in record of where a solver run spends its time
+# phase(name) is a context manager that adds wall time to a named phase (phases may nest),
+# count(name, value) adds to a named counter, and with profile=True the whole run is also
+# captured by cProfile. report() returns everything as a JSON-ready dict.
+class Instrumentation:
+    enabled = True
+
+    def __init__(self, profile=False):
+        self.phases = {}
+        self.counters = {}
+        self.profiler = cProfile.Profile() if profile else None
+        self.profiling = False
+
+    @contextmanager
+    def phase(self, name):
+        begin_time = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds, calls = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (seconds + time.perf_counter() - begin_time, calls + 1)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    # Record several counters at once (e.g. the statistics a solver returns at the end)
+    def update(self, counters):
+        for name, value in counters.items():
+            self.count(name, value)
+
+    def start_profile(self):
+        if self.profiler is not None and not self.profiling:
+            self.profiler.enable()
+            self.profiling = True
+
+    def stop_profile(self):
+        if self.profiling:
+            self.profiler.disable()
+            self.profiling = False
+
+    def report(self, rows=PROFILE_ROWS):
+        report = {
+            "phases": {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+        if self.profiler is not None:
+            self.stop_profile()
+            out = io.StringIO()
+            stats = pstats.Stats(self.profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(rows)
+            report["profile"] = out.getvalue()
+        return report
+
+
+# Stand-in used when instrumentation is off: every call is a no-op, so solvers can call it unconditionally
+class NullInstrumentation:
+    enabled = False
+
+    def phase(self, name):
+        return NULL_PHASE
+
+    def count(self, name, value=1):
+        pass
+
+    def update(self, counters):
+        pass
+
+    def start_profile(self):
+        pass
+
+    def stop_profile(self):
+        pass
+
+    def report(self, rows=PROFILE_ROWS):
+        return {}
+
+
+NULL_PHASE = nullcontext()
+NULL_INSTRUMENTATION = NullInstrumentation()
@@ -0,0 +1,181 @@
+import random
+import time
+from collections import deque
+from CandidateNeighbours import DEFAULT_K, matrix_neighbour_lists
+from DistanceOracle import distance_function
+from LocalSearch import apply_move, or_opt_moves
+from NearestNeighbour import tsp_nearest_neighbour_candidates
+from Tour import ArrayTour, route_cost
+from Instrumentation import NULL_INSTRUMENTATION
+
+# Most 2-opt flips chained together in one Lin-Kernighan move
+LK_DEPTH = 50
+
+# Alternatives for the first added edge tried before giving up on a base city
+LK_BREADTH = 5
+
+# Longest segment moved by a random double-bridge kick
+KICK_SEGMENT = 50
+
+
+def edge(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+# Grow one Lin-Kernighan chain from the tour edge (t1, t2) as a sequence of 2-opt flips
+# Each step adds (t2, t3), removes (t3, t4) and closes the tour with (t4, t1); t4 then becomes the new t2.
+# Flips past the best closing point are undone, so the tour is only changed when the chain gains.
+# Returns (gain, touched cities)
+def lk_chain(tour, dist, t1, t2, neighbour_rows, max_depth, first_t3):
+    flips = []
+    added, removed = set(), {edge(t1, t2)}
+    touched = [t1, t2]
+    g = dist(t1, t2)
+    best_gain, best_length = 0, 0
+
+    for depth in range(max_depth):
+        forward = tour.succ(t1) == t2
+        best = None
+        candidates = (first_t3,) if depth == 0 else neighbour_rows[t2]
+        for t3 in candidates:
+            g1 = g - dist(t2, t3)
+            if g1 <= 0:
+                break  # candidates are sorted, later ones only cost more
+            if t3 == tour.succ(t2) or t3 == tour.pred(t2) or edge(t2, t3) in removed:
+                continue
+            t4 = tour.pred(t3) if forward else tour.succ(t3)
+            if edge(t3, t4) in added:
+                continue
+            value = g1 + dist(t3, t4)
+            if best is None or value > best[0]:
+                best = (value, t3, t4)
+        if best is None:
+            break
+
+        g, t3, t4 = best
+        tour.move_2opt(t2, t1, t3, t4)
+        flips.append((t2, t1, t3, t4))
+        added.add(edge(t2, t3))
+        removed.add(edge(t3, t4))
+        touched += [t3, t4]
+        closed = g - dist(t4, t1)
+        if closed > best_gain:
+            best_gain, best_length = closed, len(flips)
+        t2 = t4
+
+    for a, b, c, d in reversed(flips[best_length:]):
+        tour.move_2opt(a, c, b, d)  # undo: the flip left edges (a, c) and (b, d)
+    return best_gain, touched
+
+
+# Best Lin-Kernighan move from base city t1, trying both tour neighbours and up to `breadth` first steps
+def lk_move(tour, dist, t1, neighbour_rows, max_depth=LK_DEPTH, breadth=LK_BREADTH):
+    for t2 in (tour.succ(t1), tour.pred(t1)):
+        d12 = dist(t1, t2)
+        tried = 0
+        for t3 in neighbour_rows[t2]:
+            if tried == breadth or dist(t2, t3) >= d12:
+                break
+            if t3 == t1:
+                continue
+            tried += 1
+            gain, touched = lk_chain(tour, dist, t1, t2, neighbour_rows, max_depth, t3)
+            if gain > 0:
+                return gain, touched
+    return 0, None
+
+
+# Run Lin-Kernighan moves (and Or-opt when no LK move is found) until no city improves
+# Don't-look bits: only cities next to a changed edge are looked at again
+def lk_optimise(tour, dist, neighbour_rows, active=None, max_depth=LK_DEPTH, breadth=LK_BREADTH, budget=None):
+    queue = deque(tour.order if active is None else active)
+    queued = [False] * len(tour.pos)
+    for city in queue:
+        queued[city] = True
+    total = 0
+    while queue:
+        if budget is not None and budget.tick():
+            break
+        a = queue.popleft()
+        queued[a] = False
+        gain, touched = lk_move(tour, dist, a, neighbour_rows, max_depth, breadth)
+        if gain <= 0:
+            move = or_opt_moves(tour, dist, a, neighbour_rows[a], True)
+            if move is None:
+                continue
+            gain = -move[0]
+            touched = apply_move(tour, move)
+        total += gain
+        for city in touched:
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+    return total
+
+
+# Random double bridge on a short stretch of the tour: a B C e -> a C B e
+# Kept local so the reversals inside move_segment stay cheap; returns (delta, touched cities)
+def double_bridge_kick(tour, dist, rng):
+    longest = max(1, min(KICK_SEGMENT, tour.n // 4))
+    a = tour.order[rng.randrange(tour.n)]
+    first = rng.randint(1, longest)
+    second = rng.randint(1, longest)
+    i = tour.pos[a]
+    order, n = tour.order, tour.n
+    b1, b2 = order[(i + 1) % n], order[(i + first) % n]
+    c1, c2 = order[(i + first + 1) % n], order[(i + first + second) % n]
+    e = tour.succ(c2)
+    delta = (dist(a, c1) + dist(c2, b1) + dist(b2, e)
+             - dist(a, b1) - dist(b2, c1) - dist(c2, e))
+    tour.move_segment(b1, b2, c2, e, False)
+    return delta, [a, b1, b2, c1, c2, e]
+
+
+# Chained Lin-Kernighan on 0-based indices, same return shape as the other solvers
+# Without time_limit, kicks or a limited Anytime.Budget this is plain LK to a local optimum; otherwise
+# double-bridge kicks are applied (and reverted when they do not pay off) until the budget runs out
+def lin_kernighan(cities, distances, route=None, neighbours=None, k=DEFAULT_K, max_depth=LK_DEPTH, breadth=LK_BREADTH,
+                  time_limit=None, kicks=None, seed=None, problem=None, budget=None, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time()
+    n = len(cities)
+    dist = distance_function(distances)
+    rng = random.Random(seed)
+    if neighbours is None:
+        with instrumentation.phase("candidates"):
+            neighbours = matrix_neighbour_lists(distances, k)
+    if route is None:
+        with instrumentation.phase("construction"):
+            route, _, _, _ = tsp_nearest_neighbour_candidates(distances, list(range(n)), problem, neighbours)
+        route = route[:-1]
+    neighbour_rows = neighbours.tolist() if hasattr(neighbours, "tolist") else neighbours
+
+    tour = ArrayTour(route)
+    if n >= 4:  # every tour of three or fewer cities is already optimal
+        with instrumentation.phase("improvement"):
+            lk_optimise(tour, dist, neighbour_rows, None, max_depth, breadth, budget)
+    cost = route_cost(tour.order, distances)
+    if budget is not None:
+        budget.report(tour.order, cost)
+
+    kicking = time_limit is not None or kicks is not None or (budget is not None and budget.limited)
+    done = accepted = 0
+    with instrumentation.phase("kicks"):
+        while n >= 8 and kicking and (kicks is None or done < kicks) and \
+                (time_limit is None or time.time() - begin_time < time_limit) and (budget is None or not budget.expired()):
+            done += 1
+            saved_order, saved_pos = list(tour.order), list(tour.pos)
+            delta, touched = double_bridge_kick(tour, dist, rng)
+            delta -= lk_optimise(tour, dist, neighbour_rows, touched, max_depth, breadth, budget)
+            if delta >= 0:
+                tour.order, tour.pos = saved_order, saved_pos
+            else:
+                cost += delta
+                accepted += 1
+                if budget is not None:
+                    budget.report(tour.order, cost)
+    instrumentation.update({"kicks": done, "accepted_kicks": accepted})
+
+    best_route = tour.route()
+    best_distance = route_cost(best_route, distances)
+    end_time = time.time()
+    return [cities[i] for i in best_route], best_distance, begin_time, end_time
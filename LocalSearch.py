@@ -0,0 +1,252 @@
+import time
+from collections import deque
+import numpy as np
+from CandidateNeighbours import DEFAULT_K, matrix_neighbour_lists
+from Construction import greedy_edge_tour, pair_distances
+from DistanceOracle import distance_function, distance_row
+from Tour import ArrayTour, route_cost
+from Instrumentation import NULL_INSTRUMENTATION
+
+# Longest segment moved by a single Or-opt move
+OR_OPT_LENGTH = 3
+
+# Largest tour given full 2-opt sweeps (all O(N^2) city pairs, not just candidates) after the candidate search
+FULL_TWO_OPT_LIMIT = 5000
+
+# Smallest gain for which two_opt_sweep applies a move (integer matrices gain at least 1)
+SWEEP_TOLERANCE = 1e-9
+
+
+# Function to calculate the length of a closed tour of 0-based indices
+def tour_cost(route, dist):
+    return sum(dist(route[i - 1], route[i]) for i in range(len(route)))
+
+
+# Best 2-opt move around city a using its candidate list
+def two_opt_moves(tour, dist, a, candidates, first):
+    best = None
+    for forward in (True, False):
+        b = tour.succ(a) if forward else tour.pred(a)
+        d_ab = dist(a, b)
+        for c in candidates:
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break  # candidates are sorted, no later c can give a positive first gain
+            d = tour.succ(c) if forward else tour.pred(c)
+            if c == b or d == a:
+                continue
+            delta = d_ac + dist(b, d) - d_ab - dist(c, d)
+            if delta < 0 and (best is None or delta < best[0]):
+                best = (delta, "2opt", (a, b, c, d))
+                if first:
+                    return best
+    return best
+
+
+# Best Or-opt move of a segment (length 1..OR_OPT_LENGTH) starting at a, inserted next to a candidate
+def or_opt_moves(tour, dist, a, candidates, first):
+    best = None
+    n = tour.n
+    for length in range(1, OR_OPT_LENGTH + 1):
+        if length + 3 > n:
+            break
+        # segment in forward order s1..s2 with a at either end
+        for forward in (True, False):
+            s1 = s2 = a
+            for _ in range(length - 1):
+                if forward:
+                    s2 = tour.succ(s2)
+                else:
+                    s1 = tour.pred(s1)
+            p, nx = tour.pred(s1), tour.succ(s2)
+            removed = dist(p, s1) + dist(s2, nx) - dist(p, nx)
+            if removed <= 0:
+                continue
+            inside = set()
+            city = s1
+            for _ in range(length):
+                inside.add(city)
+                city = tour.succ(city)
+            for c in candidates:
+                if dist(a, c) >= removed:
+                    break
+                if c in inside:
+                    continue
+                # put a next to c on either side of c
+                for left in (c, tour.pred(c)):
+                    right = tour.succ(left)
+                    if left in inside or right in inside or right == p:
+                        continue
+                    d_lr = dist(left, right)
+                    keep = dist(left, s1) + dist(s2, right) - d_lr
+                    flip = dist(left, s2) + dist(s1, right) - d_lr
+                    reverse = flip < keep
+                    delta = min(keep, flip) - removed
+                    if delta < 0 and (best is None or delta < best[0]):
+                        best = (delta, "oropt", (s1, s2, left, right, reverse))
+                        if first:
+                            return best
+    return best
+
+
+# Change in tour length from swapping cities a and b
+def swap_delta(tour, dist, a, b):
+    pa, na, pb, nb = tour.pred(a), tour.succ(a), tour.pred(b), tour.succ(b)
+    if na == b:
+        return dist(pa, b) + dist(a, nb) - dist(pa, a) - dist(b, nb)
+    if nb == a:
+        return dist(pb, a) + dist(b, na) - dist(pb, b) - dist(a, na)
+    return (dist(pa, b) + dist(b, na) + dist(pb, a) + dist(a, nb)
+            - dist(pa, a) - dist(a, na) - dist(pb, b) - dist(b, nb))
+
+
+# Best swap that puts a next to one of its candidates
+def swap_moves(tour, dist, a, candidates, first):
+    best = None
+    for c in candidates:
+        for b in (tour.succ(c), tour.pred(c)):
+            if b == a:
+                continue
+            delta = swap_delta(tour, dist, a, b)
+            if delta < 0 and (best is None or delta < best[0]):
+                best = (delta, "swap", (a, b))
+                if first:
+                    return best
+    return best
+
+
+# Apply a move found by one of the *_moves functions and return the cities whose edges changed
+def apply_move(tour, move):
+    kind, args = move[1], move[2]
+    if kind == "2opt":
+        tour.move_2opt(*args)
+        return list(args)
+    if kind == "oropt":
+        s1, s2, left, right, reverse = args
+        touched = [tour.pred(s1), tour.succ(s2), s1, s2, left, right]
+        tour.move_segment(s1, s2, left, right, reverse)
+        return touched
+    a, b = args
+    touched = [a, b, tour.pred(a), tour.succ(a), tour.pred(b), tour.succ(b)]
+    tour.swap(a, b)
+    return touched
+
+
+# Improve a tour in place until no move in `moves` improves it
+# strategy "first" applies the first improving move found around a city,
+# "best" applies the best move around that city; don't-look bits skip cities
+# whose surroundings have not changed since they last failed to improve; an Anytime.Budget stops it early
+def improve_tour(tour, dist, neighbour_rows, moves=("2opt", "oropt"), strategy="first", active=None, budget=None):
+    first = strategy == "first"
+    queue = deque(range(tour.n) if active is None else active)
+    queued = [False] * len(tour.pos)
+    for city in queue:
+        queued[city] = True
+    gain = 0
+    evaluations = 0
+
+    while queue:
+        if budget is not None and budget.tick():
+            break
+        a = queue.popleft()
+        queued[a] = False
+        candidates = neighbour_rows[a]
+        best = None
+        for kind in moves:
+            evaluations += 1
+            if kind == "2opt":
+                move = two_opt_moves(tour, dist, a, candidates, first)
+            elif kind == "oropt":
+                move = or_opt_moves(tour, dist, a, candidates, first)
+            elif kind == "swap":
+                move = swap_moves(tour, dist, a, candidates, first)
+            else:
+                raise ValueError("Unknown move type: " + str(kind))
+            if move is not None and (best is None or move[0] < best[0]):
+                best = move
+                if first:
+                    break
+        if best is None:
+            continue  # don't-look bit stays set until a neighbouring edge changes
+        gain -= best[0]
+        for city in apply_move(tour, best):
+            if not queued[city]:
+                queued[city] = True
+                queue.append(city)
+    return gain, evaluations
+
+
+# One pass over every tour edge (a, b), applying the best 2-opt move against all other tour edges
+# Each edge is priced against the whole tour with two distance rows (in float64, so float matrices keep
+# their fractions), so no improving 2-opt move is missed the way it can be with candidate lists. The chosen
+# move is priced again with dist, as improve_tour does, and only applied when it gains more than
+# SWEEP_TOLERANCE, so rounding can never make the two undo each other; returns (gain, cities whose edges changed)
+def two_opt_sweep(tour, distances, budget=None):
+    n = tour.n
+    dist = distance_function(distances)
+    gain = 0
+    touched = []
+    order = np.array(tour.order)
+    lengths = pair_distances(distances, order, np.roll(order, -1)).astype(np.float64)
+    for i in range(n - 2):
+        if budget is not None and budget.tick():
+            break
+        a, b = int(order[i]), int(order[i + 1])
+        later = np.arange(i + 2, n if i > 0 else n - 1)  # edge (c, d) must not share a city with (a, b)
+        c, d = order[later], order[(later + 1) % n]
+        delta = (distance_row(distances, a)[c].astype(np.float64) + distance_row(distances, b)[d]
+                 - lengths[i] - lengths[later])
+        best = int(np.argmin(delta))
+        if delta[best] >= -SWEEP_TOLERANCE:
+            continue
+        c, d = int(c[best]), int(d[best])
+        change = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+        if change < -SWEEP_TOLERANCE:
+            tour.move_2opt(a, b, c, d)
+            gain -= change
+            touched += [a, b, c, d]
+            order = np.array(tour.order)
+            lengths = pair_distances(distances, order, np.roll(order, -1)).astype(np.float64)
+    return gain, touched
+
+
+# Local search on 0-based indices; drop-in for hill_climbing with the same return shape
+# Without a route it starts from a greedy edge tour, so the search is deterministic and seed is unused.
+# The candidate-list search is followed by full 2-opt sweeps up to FULL_TWO_OPT_LIMIT cities, each change
+# being polished again with the candidate moves, so the result is a true 2-opt local optimum
+def local_search(cities, distances, route=None, moves=("2opt", "oropt"), strategy="first", neighbours=None, k=DEFAULT_K, seed=None,
+                 budget=None, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time()
+    n = len(cities)
+    dist = distance_function(distances)
+    if n < 4:  # every tour of three or fewer cities is optimal
+        route = list(range(n)) if route is None else route
+        end_time = time.time()
+        return [cities[i] for i in route], route_cost(route, distances), begin_time, end_time
+    if neighbours is None:
+        with instrumentation.phase("candidates"):
+            neighbours = matrix_neighbour_lists(distances, k)
+    if route is None:
+        with instrumentation.phase("construction"):
+            route = greedy_edge_tour(distances, np.asarray(neighbours))
+    neighbour_rows = neighbours.tolist() if hasattr(neighbours, "tolist") else neighbours
+
+    tour = ArrayTour(route)
+    with instrumentation.phase("improvement"):
+        gain, evaluations = improve_tour(tour, dist, neighbour_rows, moves, strategy, budget=budget)
+    if "2opt" in moves and n <= FULL_TWO_OPT_LIMIT:
+        with instrumentation.phase("full_two_opt"):
+            while budget is None or not budget.expired():
+                swept, touched = two_opt_sweep(tour, distances, budget)
+                if not touched:
+                    break
+                polished, done = improve_tour(tour, dist, neighbour_rows, moves, strategy, touched, budget)
+                gain += swept + polished
+                evaluations += done
+    instrumentation.update({"evaluations": evaluations, "gain": gain})
+    best_route = tour.route()
+    best_distance = route_cost(best_route, distances)
+    if budget is not None:
+        budget.report(best_route, best_distance)
+    end_time = time.time()
+    return [cities[i] for i in best_route], best_distance, begin_time, end_time
@@ -0,0 +1,278 @@
+import math
+import numpy as np
+from CandidateNeighbours import DEFAULT_K, PLANAR_WEIGHT_TYPES, coord_neighbour_lists, matrix_neighbour_lists
+from Construction import candidate_edges, greedy_edge_tour, pair_distances
+from DistanceMatrix import BLOCK_ENTRIES
+from DistanceOracle import DistanceOracle, distance_block, distance_row
+from Instrumentation import NULL_INSTRUMENTATION
+from Tour import route_cost
+
+# Instances up to this many cities get the dense 1-tree in every subgradient step
+DENSE_BOUND_LIMIT = 1000
+
+# Subgradient steps of the ascent
+SUBGRADIENT_ITERATIONS = 300
+
+# Steps without a better bound before the step size is halved
+STALL_LIMIT = 20
+
+# Most times the sparse ascent is repeated with the edges of the full 1-tree merged into the candidate graph
+CANDIDATE_ROUNDS = 4
+
+
+# Prim's minimum spanning tree on a dense weight matrix, returns (total weight, parent array)
+def prim_mst(weights):
+    k = len(weights)
+    parent = np.full(k, -1)
+    if k <= 1:
+        return 0.0, parent
+    in_tree = np.zeros(k, dtype=bool)
+    in_tree[0] = True
+    key = weights[0].astype(np.float64)
+    key[0] = np.inf
+    link = np.zeros(k, dtype=np.intp)
+    total = 0.0
+    for _ in range(k - 1):
+        j = int(np.argmin(key))
+        total += key[j]
+        parent[j] = link[j]
+        in_tree[j] = True
+        key[j] = np.inf
+        closer = (weights[j] < key) & ~in_tree
+        key[closer] = weights[j][closer]
+        link[closer] = j
+    return total, parent
+
+
+# Minimum 1-tree: MST over cities 1..n-1 plus the two cheapest edges at city 0
+def one_tree(weights):
+    n = len(weights)
+    total, parent = prim_mst(weights[1:, 1:])
+    degrees = np.zeros(n, dtype=np.int64)
+    np.add.at(degrees, parent[1:] + 1, 1)
+    degrees[2:] += 1  # edge from every non-root tree city to its parent
+    nearest = np.argpartition(weights[0, 1:], 1)[:2] + 1
+    total += weights[0, nearest].sum()
+    degrees[0] = 2
+    degrees[nearest] += 1
+    return total, degrees
+
+
+# Minimum 1-tree under the penalties pi, built one distance row at a time (O(N) memory, works on an oracle)
+# Returns (total, degrees, heads, tails) with the n edges of the 1-tree as (heads[i], tails[i])
+def one_tree_rows(distances, pi):
+    n = len(distances)
+    heads = np.empty(n, dtype=np.int64)
+    tails = np.empty(n, dtype=np.int64)
+    degrees = np.zeros(n, dtype=np.int64)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[:2] = True
+    key = distance_row(distances, 1).astype(np.float64) + pi[1] + pi
+    key[:2] = np.inf
+    link = np.ones(n, dtype=np.intp)
+    total = 0.0
+    for e in range(n - 2):
+        j = int(np.argmin(key))
+        total += key[j]
+        heads[e], tails[e] = link[j], j
+        degrees[j] += 1
+        degrees[link[j]] += 1
+        in_tree[j] = True
+        key[j] = np.inf
+        row = distance_row(distances, j) + pi[j] + pi
+        closer = (row < key) & ~in_tree
+        key[closer] = row[closer]
+        link[closer] = j
+    root = distance_row(distances, 0).astype(np.float64) + pi[0] + pi
+    root[0] = np.inf
+    nearest = np.argpartition(root, 1)[:2]
+    total += root[nearest].sum()
+    heads[n - 2:], tails[n - 2:] = 0, nearest
+    degrees[0] = 2
+    degrees[nearest] += 1
+    return total, degrees, heads, tails
+
+
+# Function to find a minimum spanning forest of a sparse graph with Boruvka's algorithm
+# Every round each component takes its cheapest outgoing edge (ties broken by edge index, so no cycles
+# form) and components are merged by pointer jumping, all in NumPy
+# Returns (mask of the chosen edges, component label of every city)
+def boruvka_forest(n, heads, tails, weights):
+    label = np.arange(n)
+    chosen = np.zeros(len(heads), dtype=bool)
+    while True:
+        head_label, tail_label = label[heads], label[tails]
+        crossing = np.flatnonzero(head_label != tail_label)
+        if len(crossing) == 0:
+            return chosen, label
+        rank = np.empty(len(crossing), dtype=np.int64)
+        rank[np.argsort(weights[crossing], kind="stable")] = np.arange(len(crossing))
+        components = np.concatenate((head_label[crossing], tail_label[crossing]))
+        edges = np.concatenate((crossing, crossing))
+        order = np.argsort(components * len(crossing) + np.concatenate((rank, rank)))
+        components, edges = components[order], edges[order]
+        first = np.flatnonzero(np.r_[True, components[1:] != components[:-1]])
+        components, edges = components[first], edges[first]
+        chosen[edges] = True
+
+        other = np.where(label[heads[edges]] == components, label[tails[edges]], label[heads[edges]])
+        parent = np.arange(n)
+        parent[components] = other
+        mutual = parent[other] == components  # both picked the same edge: the smaller label becomes the root
+        roots = components[mutual & (components < other)]
+        parent[roots] = roots
+        while True:
+            jumped = parent[parent]
+            if np.array_equal(jumped, parent):
+                break
+            parent = jumped
+        label = parent[label]
+
+
+# Function to make the candidate graph over cities 1..n-1 connected
+# k nearest lists fall apart on clustered instances, and a 1-tree over a forest gives the ascent wrong
+# degrees; every round each component but the largest gets its cheapest edge to any other component
+# (scanned in row blocks) until one component is left. Returns the extended (heads, tails, lengths)
+def connect_candidates(distances, heads, tails, lengths):
+    n = len(distances)
+    while True:
+        inner = (heads != 0) & (tails != 0)
+        _, label = boruvka_forest(n, heads[inner], tails[inner], lengths[inner])
+        ids, sizes = np.unique(label[1:], return_counts=True)
+        if len(ids) <= 1:
+            return heads, tails, lengths
+        largest = ids[np.argmax(sizes)]
+        links = []
+        for component in ids[ids != largest].tolist():
+            members = np.flatnonzero(label == component)
+            outside = np.flatnonzero(label != component)
+            outside = outside[outside != 0]
+            block = max(1, BLOCK_ENTRIES // len(outside))
+            best = (np.inf, -1, -1)
+            for start in range(0, len(members), block):
+                rows = members[start:start + block]
+                lengths_out = distance_block(distances, rows, outside)
+                r, c = np.unravel_index(int(np.argmin(lengths_out)), lengths_out.shape)
+                if lengths_out[r, c] < best[0]:
+                    best = (float(lengths_out[r, c]), int(rows[r]), int(outside[c]))
+            links.append(best)
+        heads = np.concatenate((heads, [link[1] for link in links]))
+        tails = np.concatenate((tails, [link[2] for link in links]))
+        lengths = np.concatenate((lengths, [link[0] for link in links]))
+
+
+# Minimum 1-tree restricted to the candidate edges (heads[i], tails[i]) with base lengths `lengths`
+def sparse_one_tree(n, heads, tails, lengths, pi):
+    weights = lengths + pi[heads] + pi[tails]
+    at_root = (heads == 0) | (tails == 0)
+    inner = np.flatnonzero(~at_root)
+    tree = inner[boruvka_forest(n, heads[inner], tails[inner], weights[inner])[0]]
+    root_edges = np.flatnonzero(at_root)
+    root_edges = root_edges[np.argsort(weights[root_edges], kind="stable")[:2]]
+    used = np.concatenate((tree, root_edges))
+    degrees = np.bincount(heads[used], minlength=n) + np.bincount(tails[used], minlength=n)
+    return float(weights[used].sum()), degrees
+
+
+# Lagrangian subgradient ascent: pi moves along (degree - 2) with Polyak steps towards upper_bound
+# tree(pi) returns (1-tree weight, degrees) under the penalties; returns (best bound, its penalties)
+def subgradient_ascent(tree, n, upper_bound, iterations, pi=None):
+    pi = np.zeros(n) if pi is None else np.asarray(pi, dtype=np.float64).copy()
+    best_bound, best_pi = -np.inf, pi.copy()
+    step, stalled = 2.0, 0
+    for _ in range(iterations):
+        total, degrees = tree(pi)
+        bound = total - 2.0 * pi.sum()
+        if bound > best_bound + 1e-9:
+            best_bound, best_pi, stalled = bound, pi.copy(), 0
+        else:
+            stalled += 1
+            if stalled >= STALL_LIMIT:
+                step, stalled = step / 2.0, 0
+        gradient = degrees - 2
+        norm = float(gradient @ gradient)
+        if norm == 0 or step < 1e-6:
+            break  # the 1-tree is a tour, or steps became too small to matter
+        pi = pi + step * max(upper_bound - bound, 1.0) / norm * gradient
+    return best_bound, best_pi
+
+
+# Held-Karp Lagrangian lower bound by subgradient optimisation of the city penalties pi
+def held_karp_lower_bound(adj, upper_bound, iterations=SUBGRADIENT_ITERATIONS):
+    base = np.asarray(adj, dtype=np.float64).copy()
+    np.fill_diagonal(base, np.inf)
+    return subgradient_ascent(lambda pi: one_tree(base + pi[:, None] + pi[None, :]), len(base), upper_bound, iterations)
+
+
+# Function to compute a certified lower bound on the optimal tour length of any instance
+# Up to DENSE_BOUND_LIMIT cities the ascent runs on full 1-trees. Larger instances run it on the sparse
+# candidate graph (neighbours, k nearest per city, made connected) and then price the best penalties with
+# one full 1-tree built row by row, which is a valid bound for any penalties. Edges of that full 1-tree
+# missing from the candidate graph (cheap only under the penalties) are merged in and the ascent goes on
+# from the same penalties, for up to CANDIDATE_ROUNDS more rounds while the certified bound improves.
+# Returns (bound, penalties pi); the penalties can be passed to penalised_neighbour_lists.
+def lower_bound(distances, upper_bound=None, iterations=None, neighbours=None, k=DEFAULT_K, sparse=None,
+                instrumentation=NULL_INSTRUMENTATION):
+    n = len(distances)
+    if n < 4:  # a single tour exists, its length is the bound
+        return float(route_cost(list(range(n)), distances)), np.zeros(n)
+    if sparse is None:
+        sparse = n > DENSE_BOUND_LIMIT
+    if neighbours is None and (sparse or upper_bound is None):
+        with instrumentation.phase("candidates"):
+            if isinstance(distances, DistanceOracle) and distances.edge_weight_type in PLANAR_WEIGHT_TYPES:
+                neighbours = coord_neighbour_lists(distances.points, distances.edge_weight_type, k)
+            else:
+                neighbours = matrix_neighbour_lists(distances, k)
+    if upper_bound is None:
+        with instrumentation.phase("upper_bound"):
+            upper_bound = route_cost(greedy_edge_tour(distances, neighbours), distances)
+
+    if not sparse:
+        with instrumentation.phase("subgradient"):
+            matrix = distances if isinstance(distances, np.ndarray) else distance_block(distances, np.arange(n), np.arange(n))
+            bound, pi = held_karp_lower_bound(matrix, upper_bound, iterations or SUBGRADIENT_ITERATIONS)
+        return bound, pi
+
+    heads, tails = candidate_edges(np.arange(n, dtype=np.int64), neighbours, n)
+    lengths = pair_distances(distances, heads, tails).astype(np.float64)
+    with instrumentation.phase("connect"):
+        heads, tails, lengths = connect_candidates(distances, heads, tails, lengths)
+    best_bound, best_pi, pi = -np.inf, None, None
+    for _ in range(CANDIDATE_ROUNDS + 1):
+        with instrumentation.phase("subgradient"):
+            _, pi = subgradient_ascent(lambda pi: sparse_one_tree(n, heads, tails, lengths, pi), n, upper_bound,
+                                       iterations or SUBGRADIENT_ITERATIONS, pi)
+        with instrumentation.phase("certify"):
+            total, _, tree_heads, tree_tails = one_tree_rows(distances, pi)
+        bound = total - 2.0 * pi.sum()
+        if bound <= best_bound:
+            break
+        best_bound, best_pi = bound, pi
+        keys = np.minimum(heads, tails) * n + np.maximum(heads, tails)
+        tree_keys = np.unique(np.minimum(tree_heads, tree_tails) * n + np.maximum(tree_heads, tree_tails))
+        missing = tree_keys[~np.isin(tree_keys, keys)]
+        if len(missing) == 0:
+            break
+        instrumentation.count("merged_edges", len(missing))
+        heads = np.concatenate((heads, missing // n))
+        tails = np.concatenate((tails, missing % n))
+        lengths = np.concatenate((lengths, pair_distances(distances, missing // n, missing % n).astype(np.float64)))
+    return best_bound, best_pi
+
+
+# Function to re-rank candidate lists by the penalised lengths d(i, j) + pi[i] + pi[j] of a lower bound
+# neighbours should be wider than k (e.g. 2k nearest) so the penalties can promote cities from further down
+def penalised_neighbour_lists(distances, pi, neighbours, k=DEFAULT_K):
+    n, width = neighbours.shape
+    heads = np.repeat(np.arange(n), width)
+    weights = pair_distances(distances, heads, neighbours.ravel()).reshape(n, width) + pi[neighbours] + pi[:, None]
+    order = np.argsort(weights, axis=1, kind="stable")[:, :k]
+    return np.ascontiguousarray(np.take_along_axis(neighbours, order, axis=1), dtype=np.int32)
+
+
+# Function to get the gap of a tour length above a lower bound in percent
+# Tour lengths are integers, so the bound is rounded up before comparing
+def certified_gap(cost, bound):
+    bound = math.ceil(bound - 1e-6)
+    return 100.0 * (cost - bound) / bound if bound > 0 else 0.0
@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import random
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from Anytime import Budget, share_budget
+from CandidateNeighbours import DEFAULT_K, matrix_neighbour_lists
+from DistanceOracle import DistanceOracle
+
+
+# Per-worker state, filled in once by init_multi_start_worker
+WORKER_DISTANCES = None
+WORKER_NEIGHBOURS = None
+WORKER_MEMORY = None
+WORKER_LIMITS = (None, None, None)
+
+
+# One seeded run of each metaheuristic on 0-based indices, returning (route, cost)
+# budget is the run's own Anytime.Budget (from worker_budget) or None
+def run_hill_climbing(distances, neighbours, seed, options, budget=None):
+    from LocalSearch import local_search
+    n = len(distances)
+    route = random.Random(seed).sample(range(n), n)  # random start so the runs differ
+    route, cost, _, _ = local_search(list(range(n)), distances, route=route, neighbours=neighbours, budget=budget)
+    return route, cost
+
+
+def run_simulated_annealing(distances, neighbours, seed, options, budget=None):
+    from SimulatedAnnealing import simulated_annealing_delta
+    iterations = options.get("iterations", 1000000)
+    route, cost, _, _ = simulated_annealing_delta(list(range(len(distances))), distances,
+                                                  cooling_rate=1e-4 ** (1.0 / iterations),
+                                                  max_iterations=iterations, seed=seed, budget=budget)
+    return route, cost
+
+
+def run_lin_kernighan(distances, neighbours, seed, options, budget=None):
+    from LinKernighan import lin_kernighan
+    n = len(distances)
+    route = random.Random(seed).sample(range(n), n)  # random start so the runs differ
+    route, cost, _, _ = lin_kernighan(list(range(n)), distances, route=route, neighbours=neighbours,
+                                      time_limit=options.get("time_limit"), kicks=options.get("kicks"), seed=seed,
+                                      budget=budget)
+    return route, cost
+
+
+METAHEURISTICS = {
+    "hill_climbing": run_hill_climbing,
+    "simulated_annealing": run_simulated_annealing,
+    "lin_kernighan": run_lin_kernighan,
+}
+
+
+# Attach to the shared distance matrix (or take the distances passed in directly) once per worker process
+# deadline, max_iterations and stop_event (a multiprocessing.Event) are the limits of every run's budget
+def init_multi_start_worker(memory_name, shape, dtype, distances, neighbours, deadline=None, max_iterations=None,
+                            stop_event=None):
+    global WORKER_DISTANCES, WORKER_NEIGHBOURS, WORKER_MEMORY, WORKER_LIMITS
+    if distances is not None:
+        WORKER_DISTANCES = distances
+    else:
+        WORKER_MEMORY = shared_memory.SharedMemory(name=memory_name)
+        WORKER_DISTANCES = np.ndarray(shape, dtype=dtype, buffer=WORKER_MEMORY.buf)
+        WORKER_DISTANCES.flags.writeable = False
+    WORKER_NEIGHBOURS = neighbours
+    WORKER_LIMITS = (deadline, max_iterations, stop_event)
+
+
+# Budget for one run in a worker from the limits given to init_multi_start_worker, None without limits
+def worker_budget():
+    deadline, max_iterations, stop_event = WORKER_LIMITS
+    if deadline is None and max_iterations is None and stop_event is None:
+        return None
+    return Budget(deadline=deadline, max_iterations=max_iterations, stop_event=stop_event)
+
+
+# Function to get the extra initargs of init_multi_start_worker for runs sharing `budget`
+# Each of `runs` runs gets the deadline and its share of the iterations left; the returned event is set by
+# share_budget once the budget runs out or is cancelled. Without a budget there are no limits and no event
+def budget_initargs(budget, runs):
+    if budget is None:
+        return (None, None, None), None
+    stop_event = multiprocessing.Event()
+    return budget.worker_limits(runs) + (stop_event,), stop_event
+
+
+# Function to prepare the distances for init_multi_start_worker
+# A dense matrix is copied into shared memory once; returns (initargs, memory) and the caller
+# closes and unlinks the memory (when not None) after the pool has finished
+def share_distances(distances, neighbours=None):
+    if isinstance(distances, DistanceOracle):
+        return (None, None, None, distances, neighbours), None
+    matrix = np.ascontiguousarray(distances)
+    memory = shared_memory.SharedMemory(create=True, size=max(matrix.nbytes, 1))
+    np.ndarray(matrix.shape, dtype=matrix.dtype, buffer=memory.buf)[:] = matrix
+    return (memory.name, matrix.shape, matrix.dtype.str, None, neighbours), memory
+
+
+# Run one start and report its statistics
+def run_start(task):
+    method, seed, options = task
+    begin_time = time.time()
+    route, cost = METAHEURISTICS[method](WORKER_DISTANCES, WORKER_NEIGHBOURS, seed, options, worker_budget())
+    return {"seed": seed, "cost": int(cost), "time": time.time() - begin_time, "pid": os.getpid(), "route": list(route)}
+
+
+# Function to run `starts` independently seeded runs of a metaheuristic over a process pool
+# A dense matrix is placed in shared memory once instead of being pickled for every task;
+# a DistanceOracle only holds coordinates and is sent to each worker once. Candidate lists can be passed in
+# as neighbours (e.g. from CandidateNeighbours.neighbour_lists), otherwise they come from the distances.
+# With an Anytime.Budget every run stops at its deadline, after its share of max_iterations or as soon as
+# the budget is cancelled, and each finished run's tour is reported to the budget.
+# Returns (best route as labels, best cost, per-run statistics, begin_time, end_time)
+def multi_start(cities, distances, method="hill_climbing", starts=8, workers=None, seed=0, k=DEFAULT_K, neighbours=None,
+                budget=None, **options):
+    if method not in METAHEURISTICS:
+        raise ValueError("Unknown metaheuristic: " + method + " (choose from " + ", ".join(METAHEURISTICS) + ")")
+    global WORKER_DISTANCES, WORKER_NEIGHBOURS, WORKER_LIMITS
+    begin_time = time.time()
+    if neighbours is None:
+        neighbours = matrix_neighbour_lists(distances, k)
+    tasks = [(method, seed + i, options) for i in range(starts)]
+    workers = min(workers or os.cpu_count() or 1, starts)
+    limits, stop_event = budget_initargs(budget, starts)
+    runs = []
+
+    def collect(results):
+        for run in results:
+            runs.append(run)
+            if budget is not None:
+                budget.report(run["route"], run["cost"])
+
+    with share_budget(budget, stop_event):
+        if workers == 1:
+            init_multi_start_worker(None, None, None, distances, neighbours, *limits)
+            try:
+                collect(run_start(task) for task in tasks)
+            finally:
+                WORKER_DISTANCES = WORKER_NEIGHBOURS = None
+                WORKER_LIMITS = (None, None, None)
+        else:
+            initargs, memory = share_distances(distances, neighbours)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=init_multi_start_worker,
+                                         initargs=initargs + limits) as pool:
+                    collect(pool.map(run_start, tasks))
+            finally:
+                if memory is not None:
+                    memory.close()
+                    memory.unlink()
+
+    best = min(runs, key=lambda run: run["cost"])
+    end_time = time.time()
+    return [cities[i] for i in best["route"]], best["cost"], runs, begin_time, end_time
@@ -1,13 +1,13 @@
-import tsplib95
-import itertools
-import matplotlib.pyplot as plt
 import time
+import numpy as np
+from DistanceMatrix import load_distance_matrix, matrix_to_graph, distance_coords
+from DistanceOracle import distance_function, distance_row
+from CandidateNeighbours import PLANAR_WEIGHT_TYPES, SpatialGrid, matrix_neighbour_lists, neighbour_lists
+from Plotting import finish_plot, pyplot
 
 def load_tsp_file(filename): #function to define file name
-    problem = tsplib95.load(filename) #loads file into problem variable
-    cities = list(problem.get_nodes()) #gets all the nodes storing thme in the cities variables
-    graph = {i: {j: problem.get_weight(i, j) for j in cities} for i in cities}
-    G = problem.get_graph()
+    distances, cities, problem = load_distance_matrix(filename) #loads file and builds the distance matrix
+    graph = matrix_to_graph(distances, cities) #converts the matrix into a dictionary of distances
     return cities, graph, problem #returns variables for cities and graph
 
 def tsp_nearest_neighbour(graph, cities): #defines function for nearest neighbour algorithm
@@ -35,9 +35,56 @@ def tsp_nearest_neighbour(graph, cities): #defines function for nearest neighbou
     end_time = time.time() #end time
     return path, total_cost, begin_time, end_time
 
+def tsp_nearest_neighbour_candidates(distances, cities, problem=None, neighbours=None): #nearest neighbour using candidate lists
+    begin_time = time.time() #start time
+    num_cities = len(cities)
+    dist = distance_function(distances) #works for a distance matrix or a DistanceOracle
+    if neighbours is None:
+        neighbours = matrix_neighbour_lists(distances) if problem is None else neighbour_lists(problem, distances)
+    candidate_rows = neighbours.tolist()
+
+    grid = None
+    if problem is not None and problem.coords is not None and problem.edge_weight_type in PLANAR_WEIGHT_TYPES:
+        grid = SpatialGrid(distance_coords(problem.coords, problem.edge_weight_type)) #deletion-aware search for the fallback
+        grid.reset()
+    visited = np.zeros(num_cities, dtype=bool)
+
+    current = 0
+    visited[current] = True
+    if grid is not None:
+        grid.remove(current)
+    path = [current]
+    total_cost = 0
+
+    for _ in range(num_cities - 1):
+        nearest = -1
+        for city in candidate_rows[current]: #candidates are sorted, so the first unvisited one is the nearest
+            if not visited[city]:
+                nearest = city
+                break
+        if nearest < 0: #every candidate is used up, search the remaining cities
+            if grid is not None:
+                nearest = grid.nearest(current)
+            else:
+                row = np.where(visited, np.inf, distance_row(distances, current))
+                nearest = int(np.argmin(row))
+        total_cost += dist(current, nearest)
+        visited[nearest] = True
+        if grid is not None:
+            grid.remove(nearest)
+        path.append(nearest)
+        current = nearest
+
+    # Return to the starting city
+    total_cost += dist(current, path[0])
+    path.append(path[0])
+    end_time = time.time() #end time
+    return [cities[i] for i in path], total_cost, begin_time, end_time
+
 
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     # Get the coordinates of the cities from the problem
     city_coords = problem.node_coords
 
@@ -57,7 +104,7 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 
 if __name__ == "__main__": #main function
@@ -0,0 +1,24 @@
+import os
+
+# Set TSP_HEADLESS=1 to make every plot_route save or close its figure instead of opening a window
+HEADLESS = os.environ.get("TSP_HEADLESS", "").lower() in ("1", "true", "yes")
+
+
+# Function to get matplotlib.pyplot, imported on first use so the solver modules load with only NumPy
+# Headless plots select the non-interactive Agg backend first, so no GUI toolkit is ever imported
+def pyplot(headless=False):
+    import matplotlib
+    if headless or HEADLESS:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+# Function to finish a route plot: save it to filename (if given), then show it or close it when headless
+def finish_plot(plt, show=True, filename=None):
+    if filename:
+        plt.savefig(filename)
+    if show and not HEADLESS:
+        plt.show()
+    else:
+        plt.close()
@@ -1,22 +1,19 @@
 import numpy as np
+import math
 import random
-import tsplib95
-import itertools
-import matplotlib.pyplot as plt
 import time
-
-
-# Set seed for reproducibility
-np.random.seed(42)
-random.seed(42)
+from DistanceMatrix import load_distance_matrix, matrix_to_graph
+from DistanceOracle import distance_function
+from LocalSearch import swap_delta
+from Tour import ArrayTour, route_cost
+from Instrumentation import NULL_INSTRUMENTATION
+from Plotting import finish_plot, pyplot
 
 
 # Function to load a TSPLIB file and extract cities and distances
 def load_tsp_file(filename):
-    problem = tsplib95.load(filename)
-    cities = list(problem.get_nodes())
-    graph = {i: {j: problem.get_weight(i, j) for j in cities} for i in cities}
-    G = problem.get_graph()
+    distances, cities, problem = load_distance_matrix(filename)
+    graph = matrix_to_graph(distances, cities)
     return cities, graph, problem
 
 def calculate_cost(route, graph):
@@ -67,8 +64,128 @@ def simulated_annealing(cities, graph, initial_temp, cooling_rate, max_iteration
     return best_route, best_distance, begin_time, end_time
 
 
+# Move kernels for the delta-cost annealer: each samples one random move and returns (delta, apply)
+def sample_2opt(tour, dist, rng):
+    n = tour.n
+    a = tour.order[rng.randrange(n)]
+    c = tour.order[rng.randrange(n)]
+    b, d = tour.succ(a), tour.succ(c)
+    if a == c or b == c or d == a:
+        return None
+    delta = dist(a, c) + dist(b, d) - dist(a, b) - dist(c, d)
+    return delta, lambda: tour.move_2opt(a, b, c, d)
+
+
+def sample_swap(tour, dist, rng):
+    n = tour.n
+    a = tour.order[rng.randrange(n)]
+    b = tour.order[rng.randrange(n)]
+    if a == b:
+        return None
+    return swap_delta(tour, dist, a, b), lambda: tour.swap(a, b)
+
+
+def sample_insertion(tour, dist, rng):  # move one city to a random edge elsewhere
+    n = tour.n
+    s = tour.order[rng.randrange(n)]
+    left = tour.order[rng.randrange(n)]
+    p, nx = tour.pred(s), tour.succ(s)
+    right = tour.succ(left)
+    if left == s or right == s or left == p:
+        return None
+    delta = (dist(p, nx) + dist(left, s) + dist(s, right)
+             - dist(p, s) - dist(s, nx) - dist(left, right))
+    return delta, lambda: tour.move_segment(s, s, left, right, False)
+
+
+MOVE_KERNELS = {"2opt": sample_2opt, "swap": sample_swap, "insertion": sample_insertion}
+
+
+# Function to estimate a starting temperature that accepts an average uphill move with probability 0.5
+def estimate_temperature(tour, dist, rng, kernels, samples=200):
+    uphill = []
+    for _ in range(samples):
+        move = rng.choice(kernels)(tour, dist, rng)
+        if move is not None and move[0] > 0:
+            uphill.append(move[0])
+    if not uphill:
+        return 1.0
+    return (sum(uphill) / len(uphill)) / math.log(2)
+
+
+# Simulated annealing that samples a single move per iteration and scores it by its change in length
+# schedule "geometric" multiplies the temperature by cooling_rate every iteration,
+# "adaptive" nudges it towards target_acceptance over windows of `window` moves;
+# either schedule reheats to reheat_fraction * initial_temp after reheat_after moves without a new best;
+# an Anytime.Budget can stop the run early and is told about every new best tour
+def simulated_annealing_delta(cities, distances, initial_temp=None, cooling_rate=0.99999, max_iterations=1000000,
+                              moves=("2opt", "insertion", "swap"), schedule="geometric", target_acceptance=0.05,
+                              window=1000, reheat_after=None, reheat_fraction=0.5, min_temp=1e-3, route=None, seed=None,
+                              budget=None, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.time()
+    rng = random.Random(seed)  # private stream instead of the module-level random.seed(42)
+    n = len(cities)
+    dist = distance_function(distances)
+    if route is None:
+        route = rng.sample(range(n), n)
+    tour = ArrayTour(route)
+    current_distance = route_cost(tour.order, distances)
+    best_route, best_distance = tour.route(), current_distance
+    if budget is not None:
+        budget.report(best_route, best_distance)
+    if n < 4:
+        end_time = time.time()
+        return [cities[i] for i in best_route], best_distance, begin_time, end_time
+
+    kernels = [MOVE_KERNELS[kind] for kind in moves]
+    if initial_temp is None:
+        initial_temp = estimate_temperature(tour, dist, rng, kernels)
+    temperature = initial_temp
+    accepted_in_window = 0
+    since_best = 0
+    iterations = accepted = improvements = reheats = 0
+
+    for iteration in range(1, max_iterations + 1):
+        if budget is not None and budget.tick():
+            break
+        iterations = iteration
+        move = rng.choice(kernels)(tour, dist, rng)
+        if move is not None:
+            delta, apply = move
+            if delta <= 0 or rng.random() < math.exp(-delta / temperature):
+                apply()
+                current_distance += delta
+                accepted_in_window += 1
+                accepted += 1
+                if current_distance < best_distance:
+                    best_route, best_distance = tour.route(), current_distance
+                    since_best = 0
+                    improvements += 1
+                    if budget is not None:
+                        budget.report(best_route, best_distance)
+
+        since_best += 1
+        if schedule == "geometric":
+            temperature = max(temperature * cooling_rate, min_temp)
+        elif iteration % window == 0:  # adaptive
+            rate = accepted_in_window / window
+            temperature *= cooling_rate ** window if rate > target_acceptance else 1.0 / math.sqrt(cooling_rate ** window)
+            temperature = max(temperature, min_temp)
+            accepted_in_window = 0
+        if reheat_after is not None and since_best >= reheat_after:
+            temperature = initial_temp * reheat_fraction
+            since_best = 0
+            reheats += 1
+
+    instrumentation.update({"iterations": iterations, "accepted_moves": accepted, "improvements": improvements,
+                            "reheats": reheats})
+    end_time = time.time()
+    return [cities[i] for i in best_route], best_distance, begin_time, end_time
+
+
 # Function to plot the route using matplotlib
-def plot_route(cities, route, problem):
+def plot_route(cities, route, problem, show=True, filename=None):
+    plt = pyplot(headless=not show)
     # Get the coordinates of the cities from the problem
     city_coords = problem.node_coords
 
@@ -93,7 +210,7 @@ def plot_route(cities, route, problem):
     plt.ylabel("Y-coordinate")
     plt.grid(False)
     plt.legend()
-    plt.show()
+    finish_plot(plt, show, filename)
 
 # Parameters for Simulated Annealing
 initial_temp = 500
@@ -102,6 +219,9 @@ max_iterations = 200
 
 # Set name of file
 if __name__ == "__main__":
+    # Set seed for reproducibility (only for this script, importing the module leaves the global RNGs alone)
+    np.random.seed(42)
+    random.seed(42)
     filename = "./tsplib-master/ali535.tsp"  # Replace with your TSP file path
     cities, graph, problem = load_tsp_file(filename)
     best_route, best_distance, begin_time, end_time = simulated_annealing(cities, graph, initial_temp, cooling_rate, max_iterations)
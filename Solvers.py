@@ -0,0 +1,299 @@
+import os
+os.environ.setdefault("MPLBACKEND", "Agg")  # batch runs never open a GUI window
+
+import argparse
+import json
+import math
+import sys
+import time
+from Anytime import Budget
+from DistanceMatrix import distance_matrix, read_tsp_file
+from DistanceOracle import DistanceOracle
+from InstanceCache import load_cached_instance
+from Instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from Tour import ArrayTour
+
+# Instances up to this many cities get a dense matrix, larger ones use a DistanceOracle
+DENSE_LIMIT = 12000
+
+
+# Function to load an instance once and build the shared distance structure
+# With use_cache the parsed instance and matrix come from the memory-mapped on-disk cache
+def load_instance(filename, dense_limit=DENSE_LIMIT, use_cache=False, instrumentation=NULL_INSTRUMENTATION):
+    begin_time = time.perf_counter()
+    if use_cache:
+        with instrumentation.phase("load"):
+            distances, cities, instance = load_cached_instance(filename, max_matrix_bytes=dense_limit * dense_limit * 4)
+        if distances is None:
+            distances = DistanceOracle(instance.coords, instance.edge_weight_type)
+    else:
+        with instrumentation.phase("parse"):
+            instance = read_tsp_file(filename)
+        with instrumentation.phase("matrix"):
+            if instance.edge_weight_type == "EXPLICIT" or len(instance.cities) <= dense_limit:
+                distances = distance_matrix(instance)
+            else:
+                distances = DistanceOracle(instance.coords, instance.edge_weight_type)
+    return distances, instance.cities, instance, time.perf_counter() - begin_time
+
+
+def dense(distances):
+    if isinstance(distances, DistanceOracle):
+        raise ValueError("this solver needs a dense distance matrix; the instance is too large")
+    return distances
+
+
+# Adapters: every solver takes (cities, distances, instance, options) and returns (route, cost)
+# with the route as 0-based indices (no repeated start city)
+# options["budget"] (an Anytime.Budget, set from time_limit) stops the anytime solvers early and
+# options["instrumentation"] collects their phase timings and counters
+def run_brute_force(cities, distances, instance, options):
+    from BruteForce import brute_force_parallel
+    route, cost, _, _ = brute_force_parallel(list(range(len(cities))), dense(distances), options.get("workers"),
+                                             budget=options.get("budget"), instrumentation=options["instrumentation"])
+    return list(route), cost
+
+
+def run_held_karp(cities, distances, instance, options):
+    from HeldKarp import HK_MAX_MEMORY, held_karp
+    tour, cost = held_karp(dense(distances), low_memory=options.get("low_memory", False),
+                           max_memory=options.get("max_memory", HK_MAX_MEMORY), instrumentation=options["instrumentation"])
+    return tour[:-1], cost
+
+
+def run_branch_bound(cities, distances, instance, options):
+    from BranchAndBound import branch_and_bound, parallel_branch_and_bound
+    if (options.get("workers") or 1) > 1:
+        cost, path, _, _ = parallel_branch_and_bound(dense(distances), workers=options["workers"],
+                                                     budget=options.get("budget"),
+                                                     instrumentation=options["instrumentation"])
+    else:
+        cost, path, _, _ = branch_and_bound(dense(distances), budget=options.get("budget"),
+                                            instrumentation=options["instrumentation"])
+    return path[:-1], cost
+
+
+def run_nearest_neighbour(cities, distances, instance, options):
+    from NearestNeighbour import tsp_nearest_neighbour_candidates
+    route, cost, _, _ = tsp_nearest_neighbour_candidates(distances, list(range(len(cities))), instance)
+    return route[:-1], cost
+
+
+# With starts > 1 the metaheuristics run several seeded starts over a process pool and keep the best
+def run_multi_start(method, cities, distances, instance, options):
+    from CandidateNeighbours import neighbour_lists
+    from MultiStart import multi_start
+    with options["instrumentation"].phase("candidates"):
+        neighbours = neighbour_lists(instance, distances)
+    with options["instrumentation"].phase("multi_start"):
+        route, cost, runs, _, _ = multi_start(list(range(len(cities))), distances, method, options["starts"],
+                                              options.get("workers"), options.get("seed") or 0, neighbours=neighbours,
+                                              budget=options.get("budget"), iterations=options.get("iterations", 1000000),
+                                              time_limit=options.get("time_limit"))
+    options["instrumentation"].count("starts", len(runs))
+    return route, cost
+
+
+def run_hill_climbing(cities, distances, instance, options):
+    if options.get("starts", 1) > 1:
+        return run_multi_start("hill_climbing", cities, distances, instance, options)
+    from CandidateNeighbours import neighbour_lists
+    from LocalSearch import local_search
+    with options["instrumentation"].phase("candidates"):
+        neighbours = neighbour_lists(instance, distances)
+    route, cost, _, _ = local_search(list(range(len(cities))), distances, neighbours=neighbours, seed=options.get("seed"),
+                                     budget=options.get("budget"), instrumentation=options["instrumentation"])
+    return route, cost
+
+
+def run_simulated_annealing(cities, distances, instance, options):
+    if options.get("starts", 1) > 1:
+        return run_multi_start("simulated_annealing", cities, distances, instance, options)
+    from SimulatedAnnealing import simulated_annealing_delta
+    iterations = options.get("iterations", 1000000)
+    cooling_rate = 1e-4 ** (1.0 / iterations)  # temperature falls by a factor 10^4 over the run
+    route, cost, _, _ = simulated_annealing_delta(list(range(len(cities))), distances, cooling_rate=cooling_rate,
+                                                  max_iterations=iterations, seed=options.get("seed"),
+                                                  budget=options.get("budget"), instrumentation=options["instrumentation"])
+    return route, cost
+
+
+def run_christofides(cities, distances, instance, options):
+    from Christofides import christofides_fast
+    tour, cost, _, _ = christofides_fast(list(range(len(cities))), distances, options.get("matching", "auto"),
+                                         instance.coords, instance.edge_weight_type, options["instrumentation"])
+    return tour[:-1], cost
+
+
+def run_lin_kernighan(cities, distances, instance, options):
+    if options.get("starts", 1) > 1:
+        return run_multi_start("lin_kernighan", cities, distances, instance, options)
+    from CandidateNeighbours import neighbour_lists
+    from LinKernighan import lin_kernighan
+    with options["instrumentation"].phase("candidates"):
+        neighbours = neighbour_lists(instance, distances)
+    route, cost, _, _ = lin_kernighan(list(range(len(cities))), distances, neighbours=neighbours, seed=options.get("seed"),
+                                      problem=instance, budget=options.get("budget"),
+                                      instrumentation=options["instrumentation"])
+    return route, cost
+
+
+def run_genetic_algorithm(cities, distances, instance, options):
+    from GeneticAlgorithm import genetic_algorithm
+    route, cost, _, _ = genetic_algorithm(list(range(len(cities))), distances, options.get("population") or 100,
+                                          options.get("generations") or 500, workers=options.get("workers"),
+                                          seed=options.get("seed"), budget=options.get("budget"),
+                                          instrumentation=options["instrumentation"])
+    return route, cost
+
+
+# Construction heuristics: Hilbert curve, greedy edge and farthest / nearest / cheapest insertion
+def run_construction(method, cities, distances, instance, options):
+    from Construction import construct_tour
+    with options["instrumentation"].phase("construction"):
+        route, cost, _, _ = construct_tour(list(range(len(cities))), distances, method, instance.coords,
+                                           instance.edge_weight_type)
+    return route, cost
+
+
+def run_hilbert(cities, distances, instance, options):
+    return run_construction("hilbert", cities, distances, instance, options)
+
+
+def run_greedy_edge(cities, distances, instance, options):
+    return run_construction("greedy_edge", cities, distances, instance, options)
+
+
+def run_farthest_insertion(cities, distances, instance, options):
+    return run_construction("farthest_insertion", cities, distances, instance, options)
+
+
+def run_nearest_insertion(cities, distances, instance, options):
+    return run_construction("nearest_insertion", cities, distances, instance, options)
+
+
+def run_cheapest_insertion(cities, distances, instance, options):
+    return run_construction("cheapest_insertion", cities, distances, instance, options)
+
+
+def run_decomposition(cities, distances, instance, options):
+    from Decomposition import DEFAULT_CLUSTER_SIZE, decomposition
+    route, cost, _, _ = decomposition(list(range(len(cities))), instance.coords, instance.edge_weight_type, distances,
+                                      cluster_size=options.get("cluster_size") or DEFAULT_CLUSTER_SIZE,
+                                      partition=options.get("partition", "grid"),
+                                      solver=options.get("cluster_solver", "lin_kernighan"),
+                                      repair=options.get("repair", "local_search"), workers=options.get("workers"),
+                                      seed=options.get("seed"), budget=options.get("budget"),
+                                      instrumentation=options["instrumentation"])
+    return route, cost
+
+
+SOLVERS = {
+    "brute_force": run_brute_force,
+    "held_karp": run_held_karp,
+    "branch_bound": run_branch_bound,
+    "nearest_neighbour": run_nearest_neighbour,
+    "hilbert": run_hilbert,
+    "greedy_edge": run_greedy_edge,
+    "farthest_insertion": run_farthest_insertion,
+    "nearest_insertion": run_nearest_insertion,
+    "cheapest_insertion": run_cheapest_insertion,
+    "hill_climbing": run_hill_climbing,
+    "simulated_annealing": run_simulated_annealing,
+    "christofides": run_christofides,
+    "genetic_algorithm": run_genetic_algorithm,
+    "lin_kernighan": run_lin_kernighan,
+    "decomposition": run_decomposition,
+}
+
+
+# Function to run one registered solver and return a JSON-ready result
+# With instrument (or profile, which also runs cProfile over the solver) the result gets an
+# "instrumentation" entry with per-phase wall times and solver counters
+def solve(name, cities, distances, instance, instrument=False, profile=False, **options):
+    if name not in SOLVERS:
+        raise ValueError("Unknown solver: " + name + " (choose from " + ", ".join(SOLVERS) + ")")
+    if options.get("time_limit") is not None and "budget" not in options:
+        options["budget"] = Budget(time_limit=options["time_limit"])
+    if "instrumentation" not in options:
+        options["instrumentation"] = Instrumentation(profile) if instrument or profile else NULL_INSTRUMENTATION
+    instrumentation = options["instrumentation"]
+    begin_time = time.perf_counter()
+    instrumentation.start_profile()
+    try:
+        route, cost = SOLVERS[name](cities, distances, instance, options)
+    finally:
+        instrumentation.stop_profile()
+    solve_time = time.perf_counter() - begin_time
+    result = {
+        "instance": instance.name,
+        "solver": name,
+        "cities": len(cities),
+        "cost": int(cost),
+        "solve_time": solve_time,
+        "tour": ArrayTour(route).to_labels(cities),
+    }
+    if instrumentation.enabled:
+        result["instrumentation"] = instrumentation.report()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run TSP solvers on a TSPLIB instance without any plotting")
+    parser.add_argument("filename", help="path to a .tsp file")
+    parser.add_argument("--solvers", nargs="+", default=["nearest_neighbour"], choices=sorted(SOLVERS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=1000000, help="simulated annealing iterations")
+    parser.add_argument("--population", type=int, default=100, help="genetic algorithm population size")
+    parser.add_argument("--generations", type=int, default=500, help="genetic algorithm generations")
+    parser.add_argument("--starts", type=int, default=1, help="independent seeded runs of the metaheuristics")
+    parser.add_argument("--time-limit", type=float, help="stop each solver after this many seconds with its best tour so far"
+                        " (Lin-Kernighan keeps applying kicks until then)")
+    parser.add_argument("--cluster-size", type=int, help="most cities per cluster for the decomposition solver")
+    parser.add_argument("--partition", default="grid", choices=["grid", "kmeans"], help="decomposition clustering")
+    parser.add_argument("--cluster-solver", default="lin_kernighan",
+                        choices=["nearest_neighbour", "hill_climbing", "christofides", "lin_kernighan"],
+                        help="solver run on each decomposition cluster")
+    parser.add_argument("--cache", action="store_true", help="reuse the parsed instance from the on-disk cache")
+    parser.add_argument("--bound", action="store_true",
+                        help="compute a Held-Karp lower bound once and report each tour's certified gap above it")
+    parser.add_argument("--instrument", action="store_true", help="add per-phase timings and solver counters to the output")
+    parser.add_argument("--profile", action="store_true", help="also run cProfile over each solver and add its top functions")
+    parser.add_argument("--no-tour", action="store_true", help="leave the tour out of the output")
+    parser.add_argument("--output", help="write JSON lines here instead of stdout")
+    args = parser.parse_args(argv)
+
+    loading = Instrumentation() if args.instrument or args.profile else NULL_INSTRUMENTATION
+    distances, cities, instance, load_time = load_instance(args.filename, use_cache=args.cache, instrumentation=loading)
+    bound = None
+    if args.bound:
+        from LowerBound import lower_bound
+        with loading.phase("lower_bound"):
+            bound, _ = lower_bound(distances)
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        for name in args.solvers:
+            result = solve(name, cities, distances, instance, seed=args.seed, workers=args.workers, iterations=args.iterations,
+                           time_limit=args.time_limit, starts=args.starts, population=args.population,
+                           generations=args.generations, cluster_size=args.cluster_size,
+                           partition=args.partition, cluster_solver=args.cluster_solver, instrument=args.instrument,
+                           profile=args.profile)
+            result["load_time"] = load_time
+            if bound is not None:
+                from LowerBound import certified_gap
+                result["lower_bound"] = math.ceil(bound - 1e-6)
+                result["gap_percent"] = certified_gap(result["cost"], bound)
+            if loading.enabled:
+                result["instrumentation"]["load_phases"] = loading.report()["phases"]
+            if args.no_tour:
+                del result["tour"]
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
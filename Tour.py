@@ -0,0 +1,109 @@
+import numpy as np
+from DistanceOracle import DistanceOracle, distance_function
+
+
+# Tour of 0-based city indices shared by every solver that changes a tour in place
+# order[i] is the city in position i and pos[city] its position, so successor / predecessor lookups are O(1)
+# and segment reversals always flip the shorter side of the cycle. Both are plain lists rather than NumPy
+# arrays: 2-opt, Or-opt, Lin-Kernighan and annealing moves touch a few entries at a time from Python loops,
+# where list indexing is several times faster than reading NumPy scalars. TSPLIB labels are only used at the
+# boundary (to_labels).
+class ArrayTour:
+    def __init__(self, route):
+        self.order = list(route)
+        self.n = len(self.order)
+        self.pos = [0] * self.n
+        for i, city in enumerate(self.order):
+            self.pos[city] = i
+
+    def succ(self, city):
+        i = self.pos[city] + 1
+        return self.order[i if i < self.n else 0]
+
+    def pred(self, city):
+        return self.order[self.pos[city] - 1]
+
+    # Reverse the path that runs forward from city u to city v
+    def reverse_path(self, u, v):
+        n = self.n
+        i, j = self.pos[u], self.pos[v]
+        length = (j - i) % n + 1
+        if 2 * length > n:  # flipping the complement gives the same cycle
+            i, j = (j + 1) % n, (i - 1) % n
+            length = n - length
+        order, pos = self.order, self.pos
+        for _ in range(length // 2):
+            a, b = order[i], order[j]
+            order[i], order[j] = b, a
+            pos[a], pos[b] = j, i
+            i = i + 1 if i + 1 < n else 0
+            j = j - 1 if j > 0 else n - 1
+
+    # Remove tour edges (a, b) and (c, d) and add (a, c) and (b, d)
+    # Works in either orientation, as long as b follows a in the same direction that d follows c
+    def move_2opt(self, a, b, c, d):
+        if self.succ(a) == b:
+            self.reverse_path(b, c)
+        else:
+            self.reverse_path(c, b)
+
+    # Move the segment s1..s2 (forward order) between c and e = succ(c)
+    def move_segment(self, s1, s2, c, e, reverse):
+        p, nx = self.pred(s1), self.succ(s2)
+        self.move_2opt(p, s1, c, e)  # p c..nx s2..s1 e
+        if nx != c:
+            self.move_2opt(p, c, nx, s2)  # p nx..c s2..s1 e
+        if not reverse:
+            self.move_2opt(c, s2, s1, e)  # p nx..c s1..s2 e
+
+    # Swap the positions of two cities
+    def swap(self, a, b):
+        i, j = self.pos[a], self.pos[b]
+        self.order[i], self.order[j] = b, a
+        self.pos[a], self.pos[b] = j, i
+
+    # Put a new city into the tour right after city `after`
+    def insert(self, city, after):
+        i = self.pos[after] + 1
+        self.order.insert(i, city)
+        if city >= len(self.pos):
+            self.pos.extend([0] * (city + 1 - len(self.pos)))
+        self.n += 1
+        for j in range(i, self.n):
+            self.pos[self.order[j]] = j
+
+    # Take a city out of the tour, joining its predecessor and successor
+    def remove(self, city):
+        i = self.pos[city]
+        del self.order[i]
+        self.n -= 1
+        for j in range(i, self.n):
+            self.pos[self.order[j]] = j
+
+    # Give the city `old` the index `new` (which must not be in the tour)
+    def rename(self, old, new):
+        i = self.pos[old]
+        self.order[i] = new
+        self.pos[new] = i
+
+    def route(self):
+        return list(self.order)
+
+    def to_labels(self, cities):
+        return [cities[i] for i in self.order]
+
+
+# Function to get the length of a closed tour of 0-based indices
+# A dense matrix is summed with one fancy-indexing gather, an oracle computes all edges in one call
+def route_cost(route, distances):
+    route = np.asarray(route, dtype=np.intp)
+    if len(route) == 0:
+        return 0
+    following = np.roll(route, -1)
+    if isinstance(distances, DistanceOracle):
+        return distances.tour_length(route)
+    if isinstance(distances, np.ndarray):
+        values = distances[route, following]
+        return (values.sum(dtype=np.int64) if values.dtype.kind in "iu" else values.sum()).item()
+    dist = distance_function(distances)
+    return sum(dist(a, b) for a, b in zip(route.tolist(), following.tolist()))
@@ -0,0 +1,19 @@
+import os
+from DistanceMatrix import read_tsp_file
+from DistanceOracle import DistanceOracle
+from LowerBound import lower_bound
+
+# Optimal tour length of fl1577 (TSPLIB)
+FL1577_OPTIMUM = 22249
+
+
+# fl1577 is strongly clustered: its 10 nearest neighbour graph falls apart into separate components,
+# so the sparse bound is only sound when the candidate graph is made connected before the ascent
+def test_sparse_bound_matches_dense_bound_on_clustered_instance():
+    instance = read_tsp_file(os.path.join(os.path.dirname(__file__), "tsplib-master", "fl1577.tsp"))
+    distances = DistanceOracle(instance.coords, instance.edge_weight_type)
+    sparse, _ = lower_bound(distances, sparse=True)
+    dense, _ = lower_bound(distances, sparse=False)
+    assert sparse <= FL1577_OPTIMUM
+    assert dense <= FL1577_OPTIMUM
+    assert sparse >= 0.99 * dense